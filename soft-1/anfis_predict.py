@@ -1,28 +1,180 @@
-import tensorflow as tf
+import hashlib
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
 import numpy as np
-from joblib import load  # For loading the original scaler
 
-# Load trained model and scaler once globally
-model = tf.keras.models.load_model("anfis_model.h5")
-scaler = load("scaler.pkl")  # Make sure this file exists and was saved during training
+import features as feature_kernel
+from prediction_cache import PredictionCache
+
+# Pure NumPy forward pass over the weights exported by export_anfis_weights.py
+# (ANFIS_WEIGHTS=anfis_weights_fp16.npz for the float16 variant). The
+# exported scaler is folded into the first layer, so raw feature rows go
+# straight into the first matmul. TensorFlow is only imported when the
+# export is missing.
+weights_path = os.environ.get("ANFIS_WEIGHTS", "anfis_weights.npz")
+
+
+def file_version(*paths):
+    # Content hash of the files a model is loaded from
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def load_weights(path):
+    # (Re)load an exported model; predictions and the cache switch to it
+    global layers, scale, offset, model_version
+    exported = np.load(path)
+    layers = [(exported[f"kernel_{i}"], exported[f"bias_{i}"], str(exported[f"activation_{i}"]))
+              for i in range(int(exported["layers"]))]
+    scale, offset = exported["scale"], exported["offset"]
+
+    # (X * scale + offset) @ W + b == X @ (scale[:, None] * W) + (offset @ W + b),
+    # folded in float64 whatever the stored precision
+    kernel, bias, activation = layers[0]
+    kernel = kernel.astype(np.float64)
+    layers[0] = (scale[:, None] * kernel, offset @ kernel + bias, activation)
+    model_version = file_version(path)
+
+
+if os.path.exists(weights_path):
+    load_weights(weights_path)
+    model = scaler = None
+else:
+    import tensorflow as tf
+    from joblib import load  # For loading the original scaler
+
+    # Load trained model and scaler once globally
+    model = tf.keras.models.load_model("anfis_model.h5")
+    scaler = load("scaler.pkl")  # Make sure this file exists and was saved during training
+    model_version = file_version("anfis_model.h5", "scaler.pkl")
+
+activations = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "sigmoid": lambda x: 1 / (1 + np.exp(-x)),
+    "tanh": np.tanh,
+    "softmax": lambda x: (lambda e: e / e.sum(axis=1, keepdims=True))(np.exp(x - x.max(axis=1, keepdims=True))),
+}
 
 label_map = {0: "Sell", 1: "Hold", 2: "Buy"}
 
-def predict(close, volume, high, low):
-    # Compute technical indicators
-    price_change = ((close - low) / low) * 100  # % price recovery from low
-    volume_change = ((volume - 1e6) / 1e6)       # Normalize volume
-    ma_trend = (high + low + close) / 3          # Mid-point MA approximation
-    rsi = 50  # Default RSI value; replace with real RSI if available
+# Micro-batching: concurrent predict() calls are collected for up to
+# batch_window seconds (or max_batch_size calls) and run as one model call.
+# ANFIS_BATCH_WINDOW_MS=0 calls the model directly instead.
+batch_window = float(os.environ.get("ANFIS_BATCH_WINDOW_MS", 2)) / 1000
+max_batch_size = int(os.environ.get("ANFIS_MAX_BATCH_SIZE", 64))
+
+_requests = queue.Queue()
+_batcher = None
+_batcher_lock = threading.Lock()
+
+# Memo of single predictions, keyed on the feature row (see
+# prediction_cache.py)
+cache = PredictionCache.from_env()
+
+
+def features(close, volume, high, low, rsi=None, ma_trend=None, price_change=None, volume_change=None):
+    # Feature matrix, one row per sample, in training column order: a
+    # transposed view of the array features.compute() returns
+    return feature_kernel.compute(close, volume, high, low, rsi, ma_trend, price_change, volume_change).T
+
 
-    # Prepare feature vector
-    features = np.array([[price_change, volume_change, ma_trend, rsi]])
+def forward(rows):
+    # Dense layers in float32 after the first (folded) one; float16 weights
+    # are upcast per matmul
+    out = rows
+    for kernel, bias, activation in layers:
+        out = activations[activation](out @ kernel + bias).astype(np.float32)
+    return out
+
+
+def predict_features(feature_rows):
+    if model is None:
+        preds = forward(feature_rows)
+        return [label_map[i] for i in np.argmax(preds, axis=1)]
 
     # Scale features using pre-trained scaler
-    scaled = scaler.transform(features)
+    scaled = scaler.transform(feature_rows)
+
+    # One model call for the whole batch; predict_on_batch skips the
+    # dataset/callback setup that predict() pays on every call
+    preds = np.asarray(model.predict_on_batch(scaled))
+    return [label_map[i] for i in np.argmax(preds, axis=1)]
+
+
+def predict_many(close, volume, high, low, rsi=None, ma_trend=None, price_change=None, volume_change=None):
+    return predict_features(features(close, volume, high, low, rsi, ma_trend, price_change, volume_change))
+
+
+def _run_batcher():
+    while True:
+        batch = [_requests.get()]
+        deadline = time.monotonic() + batch_window
+        while len(batch) < max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        rows, futures = zip(*batch)
+        try:
+            labels = predict_features(np.vstack(rows))
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            continue
+        for future, label in zip(futures, labels):
+            future.set_result(label)
+
+
+def _ensure_batcher():
+    # Started lazily, and again in a forked child, where threads don't
+    # survive and the inherited queue may hold the parent's requests
+    global _batcher, _requests
+    with _batcher_lock:
+        if _batcher is None or _batcher[0] != os.getpid():
+            if _batcher is not None:
+                _requests = queue.Queue()
+            thread = threading.Thread(target=_run_batcher, name="anfis-batcher", daemon=True)
+            thread.start()
+            _batcher = (os.getpid(), thread)
+
+
+def _predict_row(row):
+    if batch_window <= 0 or model is None:  # The NumPy path has no per-call overhead to amortise
+        return predict_features(row)[0]
+
+    _ensure_batcher()
+    future = Future()
+    _requests.put((row, future))
+    return future.result()
+
+
+def predict_row(row):
+    # One column of features.compute(), e.g. shared with fuzzy_logic
+    row = np.reshape(row, (1, -1))
+    key = cache.key(*row[0]) if cache.enabled else (None,)
+    if None in key:
+        return _predict_row(row)
+
+    # Inference always runs on the exact row
+    current = model_version
+    label = cache.get(key, current)
+    if label is None:
+        label = _predict_row(row)
+        cache.put(key, current, label)
+    return label
 
-    # Make prediction
-    preds = model.predict(scaled)
-    label_index = np.argmax(preds)
 
-    return label_map[label_index]
+def predict(close, volume, high, low, rsi=None, ma_trend=None, price_change=None, volume_change=None):
+    return predict_row(feature_kernel.compute_one(close, volume, high, low, rsi, ma_trend, price_change, volume_change))
@@ -1,51 +1,248 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
 import tensorflow as tf
-import pandas as pd
-from sklearn.model_selection import train_test_split
+from joblib import dump
 from sklearn.preprocessing import StandardScaler
 
-# Load preprocessed data
-data = pd.read_csv("stock_inputs.csv")
+import columnar
+
+# Streaming ANFIS trainer. Inputs are read chunk by chunk (CSV or .cols
+# bundles, one or many symbols), so the dataset never has to fit in memory.
+# Each epoch is checkpointed; rerunning with the same --checkpoint-dir
+# resumes where the last run stopped, as long as that run is unfinished and
+# its inputs and data settings are unchanged.
+
+feature_columns = ['Price Change %', 'Volume Change %', 'MA Trend', 'RSI']
+
+
+# Label encoding (Buy = 2, Hold = 1, Sell = 0) on a whole column at once
+def label_output(price_change):
+    return np.select([price_change > 2, price_change < -2], [2, 0], 1).astype(np.int32)
+
+
+def read_chunks(paths, chunk_size, validation_fraction):
+    # Feature rows with NaNs dropped, as (X, y, validation-mask) per chunk.
+    # The split is drawn from a fixed seed per chunk, so it is the same
+    # every epoch and on resume.
+    number = 0
+    for path in paths:
+        for chunk in columnar.iter_chunks(path, chunk_size, columns=feature_columns):
+            X = chunk[feature_columns].to_numpy(dtype=np.float64)
+            X = X[~np.isnan(X).any(axis=1)]
+            y = label_output(X[:, 0])
+            validation = np.random.default_rng([42, number]).random(len(X)) < validation_fraction
+            number += 1
+            yield X, y, validation
+
+
+def fit_scaler(paths, chunk_size, validation_fraction):
+    # One streaming pass for StandardScaler statistics over training rows
+    count, held_out = 0, 0
+    total, squares = np.zeros(len(feature_columns)), np.zeros(len(feature_columns))
+    for X, _, validation in read_chunks(paths, chunk_size, validation_fraction):
+        held_out += int(validation.sum())
+        X = X[~validation]
+        count += len(X)
+        total += X.sum(axis=0)
+        squares += np.square(X).sum(axis=0)
+    if count == 0:
+        raise SystemExit("❌ No complete feature rows to train on")
+    mean = total / count
+    std = np.sqrt(np.maximum(squares / count - np.square(mean), 0))
+    return count, held_out, mean, np.where(std > 0, std, 1.0)
+
+
+def make_scaler(samples, mean, scale):
+    # The fitted statistics as the StandardScaler saved next to the model
+    scaler = StandardScaler()
+    scaler.mean_, scaler.scale_, scaler.var_ = mean, scale, np.square(scale)
+    scaler.n_features_in_, scaler.n_samples_seen_ = len(feature_columns), samples
+    return scaler
+
+
+def make_dataset(paths, mean, scale, validation, rows, batch_size, chunk_size, validation_fraction, first_epoch=0):
+    # Training rows are reshuffled within each chunk every epoch
+    epochs = iter(range(first_epoch, 1 << 30))
+
+    def batches():
+        epoch = next(epochs)
+        pending_X, pending_y = np.empty((0, len(feature_columns)), np.float32), np.empty(0, np.int32)
+        for i, (X, y, mask) in enumerate(read_chunks(paths, chunk_size, validation_fraction)):
+            keep = mask if validation else ~mask
+            X = ((X[keep] - mean) / scale).astype(np.float32)
+            y = y[keep]
+            if not validation:
+                order = np.random.default_rng([epoch, i]).permutation(len(X))
+                X, y = X[order], y[order]
+
+            # Fixed-size batches across chunk boundaries
+            X, y = np.concatenate([pending_X, X]), np.concatenate([pending_y, y])
+            full = len(X) - len(X) % batch_size
+            for start in range(0, full, batch_size):
+                yield X[start:start + batch_size], y[start:start + batch_size]
+            pending_X, pending_y = X[full:], y[full:]
+        if len(pending_X):
+            yield pending_X, pending_y
+
+    signature = (tf.TensorSpec((None, len(feature_columns)), tf.float32), tf.TensorSpec((None,), tf.int32))
+    dataset = tf.data.Dataset.from_generator(batches, output_signature=signature)
+    dataset = dataset.apply(tf.data.experimental.assert_cardinality(-(-rows // batch_size)))
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def build_model():
+    # Build the neural model (ANFIS-like)
+    return tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(len(feature_columns),)),  # Input layer
+        tf.keras.layers.Dense(16, activation='tanh'),
+        tf.keras.layers.Dense(8, activation='tanh'),
+        tf.keras.layers.Dense(3, activation='softmax')  # Output: 3 classes
+    ])
+
 
-# Define label function (Buy = 2, Hold = 1, Sell = 0)
-def label_output(row):
-    if row['Price Change %'] > 2:
-        return 2  # Buy
-    elif row['Price Change %'] < -2:
-        return 0  # Sell
+def fingerprint(paths, validation_fraction, chunk_size):
+    # The input files (path, size, mtime; every file of a .cols bundle) and
+    # the settings that decide the scaler and the train/validation split
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        else:
+            found = [path]
+        for name in found:
+            stat = os.stat(name)
+            files.append([os.path.abspath(name), stat.st_size, stat.st_mtime_ns])
+    return {"files": files, "validation": validation_fraction, "chunk_size": chunk_size}
+
+
+def finite_weights(model):
+    return all(np.isfinite(w).all() for w in model.get_weights())
+
+
+class Checkpoint(tf.keras.callbacks.Callback):
+    # Saves the model (with optimizer state) and the training state after
+    # every epoch, keeps the best weights by validation loss, stops early
+    # after `patience` epochs without improvement, and logs epoch timings
+    def __init__(self, directory, state, samples, patience):
+        super().__init__()
+        self.directory = directory
+        self.state = state
+        self.samples = samples
+        self.patience = patience
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.started = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self.started
+        val_loss = logs.get("val_loss", logs["loss"])
+        print(f"Epoch {epoch + 1}: {elapsed:.2f}s, {self.samples / elapsed:,.0f} samples/sec, "
+              f"loss {logs['loss']:.4f}, val_loss {val_loss:.4f}, val_accuracy {logs.get('val_accuracy', float('nan')):.4f}")
+
+        state = self.state
+        state["epoch"] = epoch + 1
+        if np.isfinite(val_loss) and val_loss < state["best_val_loss"]:
+            state["best_val_loss"], state["wait"] = float(val_loss), 0
+            self.model.save(os.path.join(self.directory, "best.keras"))
+        else:
+            state["wait"] += 1
+
+        self.model.save(os.path.join(self.directory, "last.keras"))
+        tmp = os.path.join(self.directory, "state.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=1)
+        os.replace(tmp, os.path.join(self.directory, "state.json"))
+
+        if state["wait"] >= self.patience:
+            print(f"Stopping early: no val_loss improvement in {self.patience} epochs")
+            self.model.stop_training = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the ANFIS model")
+    parser.add_argument("inputs", nargs="*", default=[columnar.resolve("stock_inputs.csv")],
+                        help="CSV files or .cols bundles with the feature columns (default: stock_inputs)")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--learning-rate", type=float, default=0.001)
+    parser.add_argument("--patience", type=int, default=5, help="Epochs without val_loss improvement before stopping")
+    parser.add_argument("--validation", type=float, default=0.2, help="Fraction of rows held out")
+    parser.add_argument("--chunk-size", type=int, default=200_000, help="Rows read per chunk")
+    parser.add_argument("--checkpoint-dir", default="anfis_checkpoints")
+    parser.add_argument("--fresh", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--warm-start", nargs="?", const="anfis_model.h5", default=None,
+                        help="Start from an existing model (default file: anfis_model.h5)")
+    parser.add_argument("--output", default="anfis_model.h5")
+    parser.add_argument("--scaler", default="scaler.pkl", help="Where to save the training scaler")
+    args = parser.parse_args()
+
+    os.makedirs(args.checkpoint_dir, exist_ok=True)
+    state_path = os.path.join(args.checkpoint_dir, "state.json")
+    inputs = fingerprint(args.inputs, args.validation, args.chunk_size)
+
+    state = None
+    if os.path.exists(state_path) and not args.fresh:
+        with open(state_path) as f:
+            state = json.load(f)
+        if state.get("inputs") != inputs:
+            print("Inputs or data settings changed since the checkpoint; starting fresh")
+            state = None
+        elif state.get("finished"):
+            print("The checkpointed run already finished; starting fresh")
+            state = None
+
+    if state is not None:
+        # Resume: same scaling, split and optimizer state as the last run
+        model = tf.keras.models.load_model(os.path.join(args.checkpoint_dir, "last.keras"))
+        print(f"Resuming after epoch {state['epoch']} (best val_loss {state['best_val_loss']:.4f})")
     else:
-        return 1  # Hold
-
-# Apply label encoding
-data['Label'] = data.apply(label_output, axis=1)
-
-# Features and target
-X = data[['Price Change %', 'Volume Change %', 'MA Trend', 'RSI']]
-y = data['Label']
-
-# Normalize input features
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-
-# Split into train/test sets
-X_train, X_test, y_train, y_test = train_test_split(
-    X_scaled, y, test_size=0.2, random_state=42
-)
-
-# Build the neural model (ANFIS-like)
-model = tf.keras.Sequential([
-    tf.keras.layers.Input(shape=(X_train.shape[1],)),  # Input layer
-    tf.keras.layers.Dense(16, activation='tanh'),
-    tf.keras.layers.Dense(8, activation='tanh'),
-    tf.keras.layers.Dense(3, activation='softmax')  # Output: 3 classes
-])
-
-model.compile(optimizer='adam',
-              loss='sparse_categorical_crossentropy',
-              metrics=['accuracy'])
-
-# Train the model
-model.fit(X_train, y_train, epochs=50, batch_size=8, validation_split=0.1)
-
-# Save the trained model
-model.save("anfis_model.h5")
-print("✅ Model saved as 'anfis_model.h5'")
+        # A stale best model must not stand in for this run's
+        for name in ("state.json", "best.keras", "last.keras"):
+            if os.path.exists(os.path.join(args.checkpoint_dir, name)):
+                os.remove(os.path.join(args.checkpoint_dir, name))
+        samples, held_out, mean, scale = fit_scaler(args.inputs, args.chunk_size, args.validation)
+        state = {"epoch": 0, "best_val_loss": float("inf"), "wait": 0, "samples": samples, "held_out": held_out,
+                 "validation": args.validation, "mean": mean.tolist(), "scale": scale.tolist(),
+                 "inputs": inputs, "finished": False}
+        model = build_model()
+        if args.warm_start:
+            previous = tf.keras.models.load_model(args.warm_start, compile=False)
+            if finite_weights(previous):
+                model.set_weights(previous.get_weights())
+                print(f"Warm-starting from {args.warm_start}")
+            else:
+                print(f"⚠️ {args.warm_start} has non-finite weights; starting from scratch")
+        model.compile(optimizer=tf.keras.optimizers.Adam(args.learning_rate),
+                      loss='sparse_categorical_crossentropy',
+                      metrics=['accuracy'])
+
+    mean, scale = np.array(state["mean"]), np.array(state["scale"])
+    train = make_dataset(args.inputs, mean, scale, False, state["samples"], args.batch_size, args.chunk_size,
+                         state["validation"], first_epoch=state["epoch"])
+    validation = (make_dataset(args.inputs, mean, scale, True, state["held_out"], args.batch_size, args.chunk_size,
+                               state["validation"])
+                  if state["held_out"] else None)
+
+    # Train the model
+    model.fit(train, validation_data=validation, epochs=args.epochs, initial_epoch=state["epoch"],
+              shuffle=False, verbose=0,
+              callbacks=[Checkpoint(args.checkpoint_dir, state, state["samples"], args.patience)])
+
+    # Save the best model seen, and the scaler it was trained with
+    best = os.path.join(args.checkpoint_dir, "best.keras")
+    if os.path.exists(best):
+        model = tf.keras.models.load_model(best)
+    model.save(args.output)
+
+    dump(make_scaler(state["samples"], mean, scale), args.scaler)
+
+    # The next run starts fresh rather than resuming a finished one
+    state["finished"] = True
+    with open(state_path, "w") as f:
+        json.dump(state, f, indent=1)
+    print(f"✅ Model saved as '{args.output}', training scaler as '{args.scaler}'")
+    print(f"   Refresh the NumPy weights with: python export_anfis_weights.py --model {args.output} --scaler {args.scaler}")
@@ -1,28 +1,226 @@
-from flask import Flask, render_template, request, send_file
+import time
+_app_import_start = time.perf_counter()
+
+from flask import Flask, Request, Response, g, jsonify, render_template, request, send_file, url_for
 import pandas as pd
 import matplotlib
 matplotlib.use('Agg')  # Use a non-GUI backend
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+import numpy as np
+import importlib
 import io
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import downsample
+import features
+import indicators
+import metrics
+import portfolio
+from dataset_store import DatasetStore
+from ingest import InvalidUpload, read_upload
+from jobs import JobQueue, QueueFull
+from stream import StreamHub, Tailer, parse_bars, symbol_pattern
+from plot_cache import PlotCache, content_key
+
+# Uploads above UPLOAD_SPOOL_BYTES are streamed to a temp file instead of
+# RAM; MAX_UPLOAD_BYTES rejects anything larger with a 413
+upload_spool_bytes = int(os.environ.get("UPLOAD_SPOOL_BYTES", 1024 * 1024))
+
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=upload_spool_bytes, mode="rb+")
 
-import fuzzy_logic  # Your fuzzy logic system
-import anfis_predict  # Your ANFIS prediction module
 
 app = Flask(__name__)
+app.request_class = UploadRequest
+if os.environ.get("MAX_UPLOAD_BYTES"):
+    app.config["MAX_CONTENT_LENGTH"] = int(os.environ["MAX_UPLOAD_BYTES"])
+
+# Parsed uploads, one per request, so concurrent users never share a file.
+# Every upload is also written to DATASET_DIR (default: soft-datasets in the
+# system temp dir) and loaded from there on a miss, so any worker on the
+# host can serve /plot/<id>.png, whichever one took the upload. With workers
+# on several hosts, point DATASET_DIR at a shared mount.
+datasets = DatasetStore(
+    os.environ.get("DATASET_DIR") or os.path.join(tempfile.gettempdir(), "soft-datasets"),
+    ttl=int(os.environ.get("DATASET_TTL", 3600)),
+    max_bytes=int(os.environ.get("DATASET_STORE_MAX_BYTES", 256 * 1024 * 1024)),
+)
+
+# Predictors are imported on first use, so GET / and /plot.png don't wait for
+# the fuzzy rule base or the ANFIS model. Set PRELOAD_PREDICTORS=1 to load and
+# warm them at import instead, e.g. in a pre-forking server's master
+# (gunicorn --preload app:app) so workers share them copy-on-write.
+predictor_modules = ("fuzzy_logic", "anfis_predict")
+_predictors = {}
+_predictors_lock = threading.Lock()
+
+# Cold-start timings in seconds, see startup_report()
+startup_times = {}
+
+# With method "both", fuzzy and ANFIS run side by side on this shared pool,
+# so a request waits for the slower of the two rather than their sum
+predict_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("PREDICT_WORKERS", 4)),
+                                  thread_name_prefix="predict")
+predict_methods = {"fuzzy": "fuzzy_logic", "anfis": "anfis_predict"}
+
+# Uploads sent to /jobs are parsed and scored in the background by
+# JOB_WORKERS threads; once JOB_QUEUE_DEPTH jobs are waiting, new ones get a
+# 503 with Retry-After. Uploads wait in JOB_UPLOAD_DIR (default: temp dir).
+# Job status and results are shared through JOB_STATE_DIR (default:
+# soft-jobs in the system temp dir), so a poll can reach any worker on the
+# host; the queue depth is per worker.
+jobs = JobQueue(workers=int(os.environ.get("JOB_WORKERS", 2)),
+                max_pending=int(os.environ.get("JOB_QUEUE_DEPTH", 16)),
+                ttl=int(os.environ.get("JOB_TTL", 3600)),
+                state_dir=os.environ.get("JOB_STATE_DIR") or os.path.join(tempfile.gettempdir(), "soft-jobs"))
+job_upload_dir = os.environ.get("JOB_UPLOAD_DIR")
+
+# Bulk uploads to /portfolio are parsed on PORTFOLIO_WORKERS threads, one
+# file or zip member per task, up to PORTFOLIO_MAX_SYMBOLS symbols. A zip
+# member may expand to PORTFOLIO_MAX_MEMBER_BYTES, all of them together to
+# PORTFOLIO_MAX_UNZIPPED_BYTES. Results stay downloadable as JSON or CSV for
+# PORTFOLIO_RESULT_TTL seconds from PORTFOLIO_RESULT_DIR (default:
+# soft-portfolios in the system temp dir), shared by the workers on a host.
+portfolio_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("PORTFOLIO_WORKERS", 4)),
+                                    thread_name_prefix="portfolio")
+portfolio_limits = {
+    "max_symbols": int(os.environ.get("PORTFOLIO_MAX_SYMBOLS", 1000)),
+    "max_member_bytes": int(os.environ.get("PORTFOLIO_MAX_MEMBER_BYTES", 64 * 1024 * 1024)),
+    "max_total_bytes": int(os.environ.get("PORTFOLIO_MAX_UNZIPPED_BYTES", 512 * 1024 * 1024)),
+}
+portfolio_results = portfolio.ResultStore(
+    os.environ.get("PORTFOLIO_RESULT_DIR") or os.path.join(tempfile.gettempdir(), "soft-portfolios"),
+    ttl=int(os.environ.get("PORTFOLIO_RESULT_TTL", 3600)))
+
+
+def get_predictor(name):
+    module = _predictors.get(name)
+    if module is None:
+        with _predictors_lock:
+            if name not in _predictors:
+                start = time.perf_counter()
+                _predictors[name] = importlib.import_module(name)
+                startup_times[f"load_{name}"] = time.perf_counter() - start
+            module = _predictors[name]
+    return module
+
+
+def warm_up():
+    # Load every predictor and run one prediction through it, so the first
+    # real request doesn't pay for lazy setup inside the engines
+    for name in predictor_modules:
+        module = get_predictor(name)
+        start = time.perf_counter()
+        module.predict(100.0, 1.5e6, 102.0, 98.0)
+        startup_times[f"first_predict_{name}"] = time.perf_counter() - start
+    return startup_times
+
+
+def startup_report():
+    return {name: round(seconds * 1000, 2) for name, seconds in startup_times.items()}
+
+
+# Request and per-stage timings, served in Prometheus text format at /metrics
+stage_seconds = metrics.Histogram("request_stage_seconds", "Time spent in each stage of a request", labels=("stage",))
+request_seconds = metrics.Histogram("http_request_duration_seconds", "Request latency by endpoint", labels=("endpoint",))
+requests_total = metrics.Counter("http_requests_total", "Requests by endpoint and status", ("endpoint", "status"))
+upload_bytes = metrics.Histogram("upload_size_bytes", "Upload request body size", metrics.size_buckets)
+upload_rows = metrics.Histogram("upload_rows", "Rows parsed per upload", metrics.row_buckets)
+metrics.Gauge("dataset_store_bytes", "Bytes of uploads held in memory", lambda: datasets.size)
+metrics.Gauge("plot_cache_bytes", "Bytes of rendered plots cached", lambda: plot_images.size)
+metrics.Gauge("plot_cache_hits_total", "Plot cache hits", lambda: plot_images.hits, kind="counter")
+metrics.Gauge("plot_cache_misses_total", "Plot cache misses", lambda: plot_images.misses, kind="counter")
+metrics.Gauge("plot_cache_evictions_total", "Plot cache evictions", lambda: plot_images.evictions, kind="counter")
+metrics.Gauge("jobs_pending", "Background jobs waiting for a worker", lambda: jobs.pending)
+metrics.Gauge("jobs_running", "Background jobs being processed", lambda: jobs.running)
+metrics.Gauge("jobs_completed_total", "Background jobs finished", lambda: jobs.completed, kind="counter")
+metrics.Gauge("jobs_failed_total", "Background jobs that raised an error", lambda: jobs.failed, kind="counter")
+metrics.Gauge("jobs_rejected_total", "Jobs turned away with the queue full", lambda: jobs.rejected, kind="counter")
+portfolio_symbols = metrics.Histogram("portfolio_symbols", "Symbols per bulk upload", metrics.row_buckets)
+
+
+def _cache_stat(name, stat):
+    # A predictor that hasn't been loaded yet has nothing cached; reading it
+    # must not load it
+    module = _predictors.get(name)
+    return module.cache.stats()[stat] if module is not None else 0
+
+
+for _name in predictor_modules:
+    metrics.Gauge(f"{_name}_cache_items", f"Predictions memoized by {_name}",
+                  lambda name=_name: _cache_stat(name, "size"))
+    for _stat in ("hits", "misses", "evictions", "invalidations"):
+        metrics.Gauge(f"{_name}_cache_{_stat}_total", f"Prediction cache {_stat} in {_name}",
+                      lambda name=_name, stat=_stat: _cache_stat(name, stat), kind="counter")
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.profiler = metrics.start_profile()
+
+
+@app.after_request
+def record_request(response):
+    endpoint = request.endpoint or "unknown"
+    metrics.stop_profile(g.pop("profiler", None), endpoint)
+    request_seconds.observe(time.perf_counter() - g.request_start, endpoint)
+    requests_total.inc(endpoint, response.status_code)
+    return response
+
+
+def _predict(method, row):
+    with metrics.timer(stage_seconds, method):
+        return get_predictor(predict_methods[method]).predict_row(row)
+
+
+def run_predictors(method, close, volume, high, low, rsi, ma_trend, price_change=None, volume_change=None):
+    # {"fuzzy": label, "anfis": label} for the selected method(s); the
+    # features are derived once and shared by both engines
+    selected = [m for m in predict_methods if method in (m, "both")]
+    row = features.compute_one(close, volume, high, low, rsi, ma_trend, price_change, volume_change)
+    if len(selected) == 1:
+        return {selected[0]: _predict(selected[0], row)}
+    futures = {m: predict_pool.submit(_predict, m, row) for m in selected}
+    return {m: future.result() for m, future in futures.items()}
+
+
+def process_upload(file, method):
+    # Parse, store and score one upload; shared by the form and /jobs.
+    # Stream the CSV into compact, date-sorted columns (parsing,
+    # date conversion and sorting all happen in read_upload)
+    with metrics.timer(stage_seconds, "parse"):
+        columns, latest = read_upload(file)
+    upload_rows.observe(len(columns["Close"]))
+
+    # Keep the sorted series in memory for /plot/<id>.png
+    with metrics.timer(stage_seconds, "store"):
+        dataset_id = datasets.put(columns)
+
+    # Real price and volume changes, RSI and MA trend from the uploaded
+    # history (NaN when it is too short, and the predictors fall back to
+    # their single-bar approximations)
+    with metrics.timer(stage_seconds, "indicators"):
+        history = indicators.compute(columns["Close"], columns["Volume"])
+
+    # Predict the latest row based on selected method
+    with metrics.timer(stage_seconds, "predict"):
+        predictions = run_predictors(method, latest["close"], latest["volume"], latest["high"], latest["low"],
+                                     history["RSI"][-1], history["MA Trend"][-1],
+                                     history["Price Change %"][-1], history["Volume Change %"][-1])
+    return {"dataset_id": dataset_id,
+            "prediction_fuzzy": predictions.get("fuzzy"),
+            "prediction_anfis": predictions.get("anfis")}
 
-def parse_volume(value):
-    value = str(value).strip().upper().replace(',', '')
-    try:
-        if value.endswith("M"):
-            return float(value[:-1]) * 1_000_000
-        elif value.endswith("B"):
-            return float(value[:-1]) * 1_000_000_000
-        elif value.endswith("K"):
-            return float(value[:-1]) * 1_000
-        else:
-            return float(value)
-    except:
-        raise ValueError(f"Invalid volume format: {value}")
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
@@ -34,68 +232,402 @@ def index():
         if file.filename == '':
             return "No file selected!", 400
 
+        upload_bytes.observe(request.content_length or 0)
         try:
-            # Read CSV file
-            df = pd.read_csv(file)
+            try:
+                result = process_upload(file, method)
+            except InvalidUpload as e:
+                return str(e), 400
 
-            # Ensure required columns
-            required_cols = {"Date", "Open", "High", "Low", "Close", "Volume"}
-            if not required_cols.issubset(df.columns):
-                return "Invalid CSV format!", 400
+            with metrics.timer(stage_seconds, "template"):
+                return render_template("result.html", stock_name=stock_name, **result)
 
-            # Convert and sort dates
-            df['Date'] = pd.to_datetime(df['Date'], format='%d-%m-%Y', dayfirst=True, errors='coerce')
-            df = df.dropna(subset=['Date'])
-            df = df.sort_values(by='Date')
+        except Exception as e:
+            return f"Error processing file: {str(e)}", 500
 
-            # Save for plotting
-            df.to_csv("static/last_stock_data.csv", index=False)
+    return render_template("index.html")
 
-            # Extract latest row
-            latest = df.iloc[-1]
-            close = float(latest["Close"])
-            volume = parse_volume(latest["Volume"])
-            high = float(latest["High"])
-            low = float(latest["Low"])
 
-            # Predict based on selected method
-            prediction_fuzzy = fuzzy_logic.predict(close, volume, high, low) if method in ['fuzzy', 'both'] else None
-            prediction_anfis = anfis_predict.predict(close, volume, high, low) if method in ['anfis', 'both'] else None
+def _process_saved_upload(path, stock_name, method):
+    with open(path, "rb") as f:
+        return {"stock_name": stock_name, **process_upload(f, method)}
 
-            return render_template(
-                "result.html",
-                stock_name=stock_name,
-                prediction_fuzzy=prediction_fuzzy,
-                prediction_anfis=prediction_anfis
-            )
 
-        except Exception as e:
-            return f"Error processing file: {str(e)}", 500
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# Async variant of the form for large files: POST the same fields, get a job
+# ID back at once (202), then poll /jobs/<id> until it is done
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    file = request.files.get('stock_file')
+    if file is None or file.filename == '':
+        return jsonify(error="No file selected!"), 400
+    upload_bytes.observe(request.content_length or 0)
+
+    # The worker reads the upload after this request has ended
+    fd, path = tempfile.mkstemp(suffix=".csv", dir=job_upload_dir)
+    with os.fdopen(fd, "wb") as f:
+        file.save(f)
+    try:
+        job_id = jobs.submit(_process_saved_upload, path, request.form.get('stock_name', ''),
+                             request.form.get('method', 'both'), cleanup=lambda: _remove(path))
+    except QueueFull as e:
+        return jsonify(error=f"Too many jobs queued ({e}), try again later"), 503, {"Retry-After": "5"}
+
+    status_url = url_for('job_status', job_id=job_id)
+    return jsonify(job_id=job_id, status="queued", status_url=status_url), 202, {"Location": status_url}
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify(error="Unknown or expired job"), 404
+
+    status = job.to_dict()
+    if job.status == "done":
+        status.update(job.result, result_url=url_for('job_result', job_id=job_id),
+                      plot_url=url_for('plot_dataset', dataset_id=job.result["dataset_id"]))
+    return jsonify(status)
+
+
+# The same page the form shows, once the job is done
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return "Unknown or expired job", 404
+    if job.status == "failed":
+        return f"Error processing file: {job.error}", 500
+    if job.status != "done":
+        return jsonify(job.to_dict()), 202
+    return render_template("result.html", **job.result)
+
+
+def _predict_features(method, rows):
+    with metrics.timer(stage_seconds, method):
+        predictor = get_predictor(predict_methods[method])
+        return predictor.predict_features(rows if method == "fuzzy" else rows.T)
+
+
+def score_portfolio(entries, method):
+    # Result rows for portfolio.load() entries, in upload order. The latest
+    # bars of all symbols that parsed go through each engine in one batch.
+    scored = [entry for entry in entries if "error" not in entry]
+    selected = [m for m in predict_methods if method in (m, "both")]
+    predictions = {}
+    if scored:
+        rows = features.compute(*([entry[name] for entry in scored]
+                                  for name in ("close", "volume", "high", "low", "rsi", "ma_trend",
+                                             "price_change", "volume_change")),
+                                out=np.empty((len(features.feature_columns), len(scored))))
+        futures = {m: predict_pool.submit(_predict_features, m, rows) for m in selected}
+        predictions = {m: future.result() for m, future in futures.items()}
+
+    results = []
+    labels = {m: iter(predictions.get(m, ())) for m in selected}
+    for entry in entries:
+        if "error" in entry:
+            results.append({"symbol": entry["symbol"], "error": entry["error"]})
+            continue
+        result = {name: entry[name] for name in ("symbol", "date", "rows", "close", "volume")}
+        result.update({name: None if np.isnan(entry[name]) else round(entry[name], 4) for name in ("rsi", "ma_trend")})
+        result.update({m: str(next(labels[m])) for m in selected})
+        if result.get("fuzzy") == "Error":
+            result["error"] = "No fuzzy rule fired for these inputs"
+        result["dataset_id"] = datasets.put(entry["columns"])
+        results.append(result)
+    return results
 
-    return render_template("index.html")
 
+def send_portfolio(portfolio_id, results, fmt):
+    if fmt == "json":
+        return jsonify(portfolio_id=portfolio_id, results=results)
+    if fmt == "csv":
+        return Response(portfolio.to_csv(results), mimetype="text/csv",
+                        headers={"Content-Disposition": f'attachment; filename="portfolio-{portfolio_id}.csv"'})
+    return render_template("portfolio.html", portfolio_id=portfolio_id, results=results,
+                           fields=[f for f in portfolio.result_fields if any(f in result for result in results)])
+
+
+# Score many symbols in one request: a zip of per-symbol CSVs (AAPL.csv),
+# several CSVs, or one long CSV with a Symbol column, as "portfolio_files".
+# A symbol that fails becomes an error row. format=json or format=csv
+# returns the results directly instead of the table page.
+@app.route('/portfolio', methods=['GET', 'POST'])
+def portfolio_upload():
+    if request.method == 'GET':
+        return render_template("portfolio.html")
+
+    files = [file for file in request.files.getlist('portfolio_files') if file.filename]
+    if not files:
+        return "No file selected!", 400
+    upload_bytes.observe(request.content_length or 0)
+
+    try:
+        with metrics.timer(stage_seconds, "parse"):
+            entries = portfolio.load([(file.filename, file.stream) for file in files], portfolio_pool,
+                                     **portfolio_limits)
+        portfolio_symbols.observe(len(entries))
+        with metrics.timer(stage_seconds, "predict"):
+            results = score_portfolio(entries, request.form.get('method', 'both'))
+    except InvalidUpload as e:
+        return str(e), 400
+    except Exception as e:
+        return f"Error processing files: {str(e)}", 500
+
+    portfolio_id = portfolio_results.put(results)
+    return send_portfolio(portfolio_id, results, request.values.get('format', 'html'))
+
+
+@app.route('/portfolio/<portfolio_id>.<any(json, csv):fmt>')
+def portfolio_download(portfolio_id, fmt):
+    results = portfolio_results.get(portfolio_id)
+    if results is None:
+        return "Results not found or expired, please upload the files again.", 404
+    return send_portfolio(portfolio_id, results, fmt)
+
+# Rendered plots, keyed by a hash of the plotted data and plot_options, so
+# repeat views skip parsing and drawing until the data actually changes.
+# Long series are downsampled (PLOT_DOWNSAMPLE: lttb, minmax or none) to
+# points_per_pixel points per pixel of figure width before drawing, so render
+# time and PNG size stay flat however many rows were uploaded; markers are
+# only drawn once a series is short enough for them to be told apart.
+plot_options = {"figsize": [8, 5], "dpi": 100, "marker": "o", "marker_limit": 150,
+                "downsample": os.environ.get("PLOT_DOWNSAMPLE", "lttb"),
+                "points_per_pixel": float(os.environ.get("PLOT_POINTS_PER_PIXEL", 1))}
+plot_images = PlotCache(max_bytes=int(os.environ.get("PLOT_CACHE_MAX_BYTES", 32 * 1024 * 1024)))
+
+# ?view=ohlc draws candles with a volume panel instead, aggregated into
+# ?bars= bars (default ohlc_bars, clamped to ohlc_bar_range)
+ohlc_bars = int(os.environ.get("PLOT_OHLC_BARS", 120))
+ohlc_bar_range = (10, 1000)
+
+
+def plot_points():
+    return max(int(plot_options["figsize"][0] * plot_options["dpi"] * plot_options["points_per_pixel"]), 3)
+
+
+def render_plot(dates, close):
+    dates, close = np.asarray(dates), np.asarray(close, dtype=float)
+    target = plot_points()
+    if len(close) > target and plot_options["downsample"] == "lttb":
+        keep = downsample.lttb(dates, close, target)
+        dates, close = dates[keep], close[keep]
+    elif len(close) > target and plot_options["downsample"] == "minmax":
+        keep = downsample.minmax(close, target)
+        dates, close = dates[keep], close[keep]
+    marker = plot_options["marker"] if len(close) <= plot_options["marker_limit"] else None
+
+    fig, ax = plt.subplots(figsize=plot_options["figsize"])
+    ax.plot(dates, close, label="Stock Closing Price", color='blue', marker=marker, linestyle='-')
+    ax.set_title("📈 Stock Price Trend")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Closing Price")
+    ax.legend()
+    plt.xticks(rotation=45)
+
+    img = io.BytesIO()
+    fig.savefig(img, format='png', dpi=plot_options["dpi"], bbox_inches="tight")
+    plt.close(fig)
+    return img.getvalue()
+
+
+def render_ohlc(dataset, bars):
+    data = downsample.ohlc(dataset["Date"], dataset["Open"], dataset["High"], dataset["Low"],
+                           dataset["Close"], dataset["Volume"], bars)
+    x = mdates.date2num(data["Date"])
+    colors = np.where(data["Close"] >= data["Open"], "green", "red")
+
+    # Bodies and volume are thick vertical lines, one collection each rather
+    # than a patch per bar, about half as wide as each bar's slot on the axes
+    fig, (price_ax, volume_ax) = plt.subplots(2, 1, sharex=True, figsize=plot_options["figsize"],
+                                              gridspec_kw={"height_ratios": [3, 1]})
+    width = max(plot_options["figsize"][0] * 72 * 0.4 / len(x), 0.5)
+    price_ax.vlines(x, data["Low"], data["High"], color=colors, linewidth=min(width, 1))
+    price_ax.vlines(x, np.minimum(data["Open"], data["Close"]), np.maximum(data["Open"], data["Close"]),
+                    color=colors, linewidth=width)
+    price_ax.set_title(f"📈 Stock Price ({len(x)} bars)")
+    price_ax.set_ylabel("Price")
+    volume_ax.vlines(x, 0, data["Volume"], color=colors, linewidth=width)
+    volume_ax.set_ylim(bottom=0)
+    volume_ax.set_ylabel("Volume")
+    volume_ax.set_xlabel("Date")
+    volume_ax.xaxis_date()
+    plt.setp(volume_ax.get_xticklabels(), rotation=45)
+
+    img = io.BytesIO()
+    fig.savefig(img, format='png', dpi=plot_options["dpi"], bbox_inches="tight")
+    plt.close(fig)
+    return img.getvalue()
+
+
+def send_plot(key, last_modified, render):
+    # The browser already has this exact image
+    if key in request.if_none_match:
+        return "", 304, {"ETag": f'"{key}"'}
+
+    png = plot_images.get(key)
+    if png is None:
+        with metrics.timer(stage_seconds, "plot_render"):
+            png = render()
+        plot_images.put(key, png)
+
+    # send_file answers If-None-Match / If-Modified-Since with 304s
+    return send_file(io.BytesIO(png), mimetype='image/png', etag=key,
+                     last_modified=last_modified, max_age=0)
+
+
+@app.route('/plot/<dataset_id>.png')
+def plot_dataset(dataset_id):
+    dataset = datasets.get(dataset_id)
+    if dataset is None:
+        return "Plot data not found or expired, please upload the file again.", 404
+
+    try:
+        if request.args.get("view") == "ohlc":
+            bars = min(max(request.args.get("bars", ohlc_bars, type=int), ohlc_bar_range[0]), ohlc_bar_range[1])
+            key = content_key(dataset.digest.encode(), {**plot_options, "view": "ohlc", "bars": bars})
+            return send_plot(key, dataset.created, lambda: render_ohlc(dataset, bars))
+
+        key = content_key(dataset.digest.encode(), plot_options)
+        return send_plot(key, dataset.created, lambda: render_plot(dataset["Date"], dataset["Close"]))
+    except Exception as e:
+        return f"Error generating plot: {str(e)}", 500
+
+
+# Sample series shipped in static/, no longer written by uploads
 @app.route('/plot.png')
 def plot():
     try:
-        df = pd.read_csv("static/last_stock_data.csv")
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-        df = df.dropna(subset=['Date'])
-
-        fig, ax = plt.subplots(figsize=(8, 5))
-        ax.plot(df["Date"], df["Close"], label="Stock Closing Price", color='blue', marker='o', linestyle='-')
-        ax.set_title("📈 Stock Price Trend")
-        ax.set_xlabel("Date")
-        ax.set_ylabel("Closing Price")
-        ax.legend()
-        plt.xticks(rotation=45)
-
-        img = io.BytesIO()
-        fig.savefig(img, format='png', bbox_inches="tight")
-        img.seek(0)
-        return send_file(img, mimetype='image/png')
+        path = "static/last_stock_data.csv"
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        def render():
+            df = pd.read_csv(io.BytesIO(data))
+            df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+            df = df.dropna(subset=['Date'])
+            return render_plot(df["Date"], df["Close"])
+
+        return send_plot(content_key(data, plot_options), os.path.getmtime(path), render)
 
     except Exception as e:
         return f"Error generating plot: {str(e)}", 500
 
+# Live feeds: POST CSV chunks of new bars to /stream/<symbol>/bars (or
+# append lines to STREAM_TAIL_DIR/<SYMBOL>.csv) and follow the signals at
+# /stream/<symbol>, a page reading the SSE endpoint /stream/<symbol>/events.
+# Every bar is scored with STREAM_METHOD (default both). Feeds are held by
+# one process, so run the app with a single worker when streaming (the
+# bars POST and the SSE connection must reach the same one). A symbol with
+# no subscribers and no bars for STREAM_IDLE_TTL seconds is dropped.
+stream_method = os.environ.get("STREAM_METHOD", "both")
+stream_keepalive = float(os.environ.get("STREAM_KEEPALIVE", 15))
+
+
+def stream_signal(close, volume, high, low, rsi, ma_trend, price_change, volume_change):
+    with metrics.timer(stage_seconds, "stream_bar"):
+        predictions = run_predictors(stream_method, close, volume, high, low, rsi, ma_trend,
+                                     price_change, volume_change)
+    return {"fuzzy": predictions.get("fuzzy"), "anfis": predictions.get("anfis")}
+
+
+streams = StreamHub(stream_signal, backlog=int(os.environ.get("STREAM_BACKLOG", 100)),
+                    max_symbols=int(os.environ.get("STREAM_MAX_SYMBOLS", 1000)),
+                    idle_ttl=float(os.environ.get("STREAM_IDLE_TTL", 3600)))
+metrics.Gauge("stream_symbols", "Symbols with a live feed", lambda: streams.symbols)
+metrics.Gauge("stream_bars_total", "Bars scored from live feeds", lambda: streams.bars, kind="counter")
+metrics.Gauge("stream_dropped_total", "SSE subscribers dropped for falling behind", lambda: streams.dropped, kind="counter")
+metrics.Gauge("stream_evicted_total", "Idle feeds dropped", lambda: streams.evicted, kind="counter")
+
+if os.environ.get("STREAM_TAIL_DIR"):
+    tailer = Tailer(streams, os.environ["STREAM_TAIL_DIR"], float(os.environ.get("STREAM_TAIL_INTERVAL", 1)))
+    tailer.start()
+
+
+@app.route('/stream/<symbol>/bars', methods=['POST'])
+def stream_bars(symbol):
+    if not symbol_pattern.match(symbol):
+        return jsonify(error="Invalid symbol"), 400
+    # A raw CSV body (curl --data-binary), or a form upload in the field "bars"
+    if request.mimetype == "multipart/form-data":
+        file = request.files.get('bars')
+        text = file.read().decode() if file is not None else ""
+    else:
+        text = request.get_data(as_text=True, parse_form_data=False)
+    try:
+        bars = parse_bars(text)
+        signals = streams.push(symbol.upper(), bars)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(accepted=len(signals), skipped=len(bars) - len(signals), signals=signals)
+
+
+@app.route('/stream/<symbol>/events')
+def stream_events(symbol):
+    if not symbol_pattern.match(symbol):
+        return "Invalid symbol", 400
+    symbol = symbol.upper()
+    try:
+        after = int(request.headers.get("Last-Event-ID") or request.args.get("after") or 0)
+    except ValueError as e:
+        return str(e), 400
+    subscriber = streams.subscribe(symbol, after)
+
+    # No bars yet: say so and end the response; EventSource reconnects after
+    # the retry delay, and no feed is created until bars arrive
+    if subscriber is None:
+        return Response("retry: 5000\nevent: waiting\ndata: {}\n\n", mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache"})
+
+    def events():
+        try:
+            yield "retry: 2000\n\n"
+            while True:
+                try:
+                    signal = subscriber.get(timeout=stream_keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if signal is None:
+                    yield "event: dropped\ndata: {}\n\n"
+                    return
+                yield f"id: {signal['seq']}\nevent: signal\ndata: {json.dumps(signal)}\n\n"
+        finally:
+            streams.unsubscribe(symbol, subscriber)
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route('/stream/<symbol>')
+def stream_page(symbol):
+    if not symbol_pattern.match(symbol):
+        return "Invalid symbol", 400
+    return render_template("stream.html", symbol=symbol.upper())
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+startup_times["app_import"] = time.perf_counter() - _app_import_start
+
+if os.environ.get("PRELOAD_PREDICTORS") == "1":
+    warm_up()
+    app.logger.warning("Predictors preloaded: %s", startup_report())
+
 if __name__ == "__main__":
+    # Cold-start latency report in ms (JSON), for tracking across releases
+    if "--startup-report" in sys.argv:
+        warm_up()
+        print(json.dumps(startup_report(), indent=2))
+        sys.exit(0)
+
     app.run(debug=True)
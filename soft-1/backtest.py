@@ -0,0 +1,176 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import anfis_predict
+import columnar
+import fuzzy_logic
+import indicators
+import market_data
+
+# Walk-forward backtest of the fuzzy and ANFIS signals over daily OHLCV.
+# Each bar is scored from indicators that only look back, and the position
+# decided at a bar's close earns the next bar's return, so nothing trades
+# on information it would not have had. Symbols run in parallel; within a
+# symbol everything is whole-array NumPy. FUZZY_LUT=1 scores the fuzzy
+# signals from the lookup table where it agrees with the exact engine.
+
+strategies = ["fuzzy", "anfis", "buy_and_hold"]
+trading_days = 252
+
+
+def score(columns):
+    close, volume, high, low = (columns[name] for name in ("Close", "Volume", "High", "Low"))
+    features = indicators.compute(close, volume)
+    history = [features[name] for name in ("RSI", "MA Trend", "Price Change %", "Volume Change %")]
+    return {
+        "fuzzy": fuzzy_logic.predict_many(close, volume, high, low, *history),
+        "anfis": np.asarray(anfis_predict.predict_many(close, volume, high, low, *history)),
+    }
+
+
+def positions(labels, short=False):
+    # Buy goes long, Sell goes flat (or short); Hold and Error keep the
+    # previous position, done as a forward fill over signal indices
+    target = np.full(len(labels), np.nan)
+    target[labels == "Buy"] = 1
+    target[labels == "Sell"] = -1 if short else 0
+    last = np.where(np.isnan(target), 0, np.arange(len(target)))
+    np.maximum.accumulate(last, out=last)
+    held = target[last]
+    held[np.isnan(held)] = 0
+    return held
+
+
+def simulate(close, held, cost):
+    # Daily strategy returns after costs; cost is charged per unit of turnover
+    returns = np.zeros(len(close))
+    returns[1:] = close[1:] / close[:-1] - 1
+    exposure = np.concatenate([[0.0], held[:-1]])
+    turnover = np.abs(np.diff(exposure, prepend=0.0))
+    return exposure * returns - turnover * cost, exposure, turnover
+
+
+def metrics(daily, exposure, turnover, folds):
+    equity = np.cumprod(1 + daily)
+    years = len(daily) / trading_days
+    std = daily.std()
+    result = {
+        "Bars": len(daily),
+        "Total Return %": (equity[-1] - 1) * 100,
+        "CAGR %": (equity[-1] ** (1 / years) - 1) * 100 if years > 0 and equity[-1] > 0 else np.nan,
+        "Sharpe": daily.mean() / std * np.sqrt(trading_days) if std > 0 else np.nan,
+        "Max Drawdown %": (equity / np.maximum.accumulate(equity) - 1).min() * 100,
+        "Trades": int(np.count_nonzero(turnover)),
+        "Exposure %": np.abs(exposure).mean() * 100,
+    }
+
+    # Walk-forward view: the same run cut into consecutive out-of-sample
+    # windows, each compounded on its own; never more windows than bars
+    folds = min(folds, len(daily))
+    if folds > 1:
+        starts = np.linspace(0, len(daily), folds + 1).astype(int)[:-1]
+        log_growth = np.add.reduceat(np.log1p(daily), starts)
+        for i, value in enumerate(np.expm1(log_growth)):
+            result[f"Fold {i + 1} %"] = value * 100
+    return result
+
+
+def backtest_symbol(symbol, columns, cost=0.0005, short=False, folds=1):
+    columns = {name: np.asarray(values, dtype=float) for name, values in columns.items()}
+    if len(columns["Close"]) < 2:
+        raise ValueError("needs at least 2 bars")
+    signals = score(columns)
+    signals["buy_and_hold"] = np.full(len(columns["Close"]), "Buy", dtype=object)
+
+    rows = []
+    for strategy in strategies:
+        daily, exposure, turnover = simulate(columns["Close"], positions(signals[strategy], short), cost)
+        rows.append({"Symbol": symbol, "Strategy": strategy, **metrics(daily, exposure, turnover, folds)})
+    return rows
+
+
+def split_symbols(frame):
+    # Long-format table (Symbol, Date, OHLCV) -> {symbol: columns}, date-sorted
+    symbols = frame["Symbol"].astype(str).to_numpy()
+    dates = pd.to_datetime(frame["Date"]).to_numpy() if "Date" in frame else np.arange(len(frame))
+    order = np.lexsort((dates, symbols))
+    names, starts = np.unique(symbols[order], return_index=True)
+    bounds = list(starts[1:]) + [len(order)]
+    return {name: {column: frame[column].to_numpy(dtype=float)[order[start:stop]] for column in market_data.ohlcv_columns}
+            for name, start, stop in zip(names, starts, bounds)}
+
+
+def run(histories, cost=0.0005, short=False, folds=1, workers=None):
+    workers = os.cpu_count() if workers is None else workers
+    rows, bars = [], 0
+    started = time.perf_counter()
+
+    def collect(symbol, result):
+        nonlocal bars
+        try:
+            symbol_rows = result.result() if workers > 0 else result()
+        except Exception as e:
+            print(f"⚠️ Skipping {symbol}: {e}")
+            return
+        rows.extend(symbol_rows)
+        bars += symbol_rows[0]["Bars"]
+
+    if workers > 0:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = {symbol: pool.submit(backtest_symbol, symbol, columns, cost, short, folds)
+                       for symbol, columns in histories.items()}
+            for symbol, future in futures.items():
+                collect(symbol, future)
+    else:
+        for symbol, columns in histories.items():
+            collect(symbol, lambda: backtest_symbol(symbol, columns, cost, short, folds))
+
+    elapsed = time.perf_counter() - started
+    return pd.DataFrame(rows), bars, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest fuzzy and ANFIS signals over OHLCV history")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--input", help="Long-format CSV or .cols bundle with Symbol, Date and OHLCV columns")
+    source.add_argument("--symbols", nargs="+", default=["AAPL"], help="Symbols to load through market_data")
+    parser.add_argument("--start", default="2018-01-01")
+    parser.add_argument("--end", default=str(pd.Timestamp.now().date()))
+    parser.add_argument("--cost", type=float, default=5, help="Cost per unit of turnover, in basis points")
+    parser.add_argument("--short", action="store_true", help="Go short on Sell instead of flat")
+    parser.add_argument("--folds", type=int, default=4, help="Consecutive walk-forward windows to report")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: CPU count, 0 runs in this process)")
+    parser.add_argument("--output", help="Write per-symbol results to this CSV or .cols path")
+    args = parser.parse_args()
+
+    loaded = time.perf_counter()
+    if args.input:
+        histories = split_symbols(columnar.read_table(args.input))
+    else:
+        histories = {symbol: {name: data[name].to_numpy() for name in market_data.ohlcv_columns}
+                     for symbol, data in market_data.load_many(args.symbols, args.start, args.end).items()}
+    loaded = time.perf_counter() - loaded
+    if not histories:
+        sys.exit("❌ No price history to backtest")
+
+    results, bars, elapsed = run(histories, args.cost / 10_000, args.short, args.folds, args.workers)
+    if results.empty:
+        sys.exit("❌ Every symbol failed")
+
+    with pd.option_context("display.max_rows", 200, "display.width", 200, "display.float_format", "{:.2f}".format):
+        print(results.to_string(index=False))
+        print("\nMean across symbols:")
+        print(results.drop(columns="Symbol").groupby("Strategy", sort=False).mean().to_string())
+
+    print(f"\n✅ {len(histories)} symbols, {bars} bars in {elapsed:.2f}s "
+          f"({bars / elapsed:,.0f} bars/sec; loading took {loaded:.2f}s)")
+    if args.output:
+        columnar.write_table(results, args.output)
+        print(f"Results written to {args.output}")
@@ -0,0 +1,251 @@
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Reproducible performance benchmarks on synthetic OHLCV data: predictor
+# latency and batch throughput, the fuzzy_predictor batch tool, and the
+# Flask upload and plot routes. Results are written as JSON; with
+# --baseline, any metric that got worse by more than --tolerance fails the
+# run (exit status 1).
+#
+#   python benchmark.py --output bench.json
+#   python benchmark.py --baseline bench.json --tolerance 0.25
+#
+# Metric names end in their unit: *_us / *_ms / *_mb are lower-is-better,
+# *_per_sec is higher-is-better. p95/p99 latencies are reported but only
+# p50, throughput and memory can fail a comparison; tails are too noisy on
+# shared machines. Compare against a baseline from the same machine.
+
+seed = 1234
+
+
+def synthetic_ohlcv(n, seed=seed):
+    # Random-walk daily bars in the upload format (DD-MM-YYYY, "12.3M" volumes)
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, n)))
+    open_ = close * np.exp(rng.normal(0, 0.005, n))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, n))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, n))
+    volume = rng.uniform(5, 90, n)
+    dates = pd.date_range("1990-01-01", periods=n, freq="D")
+    return pd.DataFrame({
+        "Date": dates.strftime("%d-%m-%Y"),
+        "Close": close.round(2), "Open": open_.round(2), "High": high.round(2), "Low": low.round(2),
+        "Volume": [f"{v:.2f}M" for v in volume],
+        "Change %": [f"{c:.2f}%" for c in np.diff(close, prepend=close[0]) / close * 100],
+    })
+
+
+def synthetic_inputs(n, seed=seed):
+    # Raw predictor inputs: close, volume, high, low, rsi, ma_trend
+    rng = np.random.default_rng(seed)
+    close = rng.uniform(10, 500, n)
+    return (close, rng.uniform(1e5, 3e6, n), close * rng.uniform(1.0, 1.1, n),
+            close * rng.uniform(0.9, 1.0, n), rng.uniform(0, 100, n), rng.uniform(-5, 5, n))
+
+
+def percentiles(seconds, unit=1e6, suffix="us"):
+    values = np.asarray(seconds) * unit
+    return {f"p50_{suffix}": float(np.percentile(values, 50)),
+            f"p95_{suffix}": float(np.percentile(values, 95)),
+            f"p99_{suffix}": float(np.percentile(values, 99))}
+
+
+def timed(fn, repeat, warmup=3):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def peak_memory(fn):
+    # Peak Python/NumPy allocation while fn runs, in MB (timed separately,
+    # since tracing slows everything down)
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def bench_latency(module, calls):
+    inputs = synthetic_inputs(calls)
+    rows = iter(range(1 << 62))
+
+    def one():
+        i = next(rows) % calls
+        try:
+            module.predict(*(float(x[i]) for x in inputs))
+        except ValueError:  # No fuzzy rule fired; still a full evaluation
+            pass
+
+    return percentiles(timed(one, calls))
+
+
+def bench_throughput(module, sizes, repeat):
+    result = {}
+    for size in sizes:
+        inputs = synthetic_inputs(size)
+        best = min(timed(lambda: module.predict_many(*inputs), repeat, warmup=1))
+        result[f"rows_{size}_per_sec"] = size / best
+    largest = synthetic_inputs(max(sizes))
+    result["peak_mb"] = peak_memory(lambda: module.predict_many(*largest))
+    return result
+
+
+def bench_fuzzy_predictor(rows, repeat):
+    import fuzzy_predictor
+
+    inputs = synthetic_inputs(rows)
+    features = pd.DataFrame({"Price Change %": (inputs[0] - inputs[3]) / inputs[3] * 100,
+                             "Volume Change %": (inputs[1] - 1e6) / 1e4,
+                             "MA Trend": inputs[5], "RSI": inputs[4]})
+    with tempfile.TemporaryDirectory() as tmp:
+        source, target = os.path.join(tmp, "in.csv"), os.path.join(tmp, "out.csv")
+        features.to_csv(source, index=False)
+        quiet = lambda: fuzzy_predictor.score_file(source, target, chunk_size=50_000, workers=0)
+
+        def run():
+            stdout, sys.stdout = sys.stdout, io.StringIO()
+            try:
+                quiet()
+            finally:
+                sys.stdout = stdout
+
+        best = min(timed(run, repeat, warmup=1))
+        return {"rows_per_sec": rows / best, "peak_mb": peak_memory(run)}
+
+
+def bench_routes(upload_rows, repeat):
+    import app
+    from plot_cache import PlotCache
+
+    client = app.app.test_client()
+    app.warm_up()
+    warnings.filterwarnings("ignore", message="Glyph .* missing from font")  # The emoji in the plot title
+    result = {}
+
+    for rows in upload_rows:
+        body = synthetic_ohlcv(rows).to_csv(index=False).encode()
+
+        def upload():
+            response = client.post("/", data={"stock_name": "BENCH", "method": "both",
+                                              "stock_file": (io.BytesIO(body), "bench.csv")},
+                                   content_type="multipart/form-data")
+            if response.status_code != 200:
+                raise RuntimeError(f"upload returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+        result.update({f"upload_{rows}_{k}": v for k, v in percentiles(timed(upload, repeat), 1e3, "ms").items()})
+        result[f"upload_{rows}_peak_mb"] = peak_memory(upload)
+
+    def plot():
+        response = client.get("/plot.png")
+        if response.status_code != 200:
+            raise RuntimeError(f"/plot.png returned {response.status_code}")
+
+    def cold_plot():
+        app.plot_images = PlotCache(app.plot_images.max_bytes)
+        plot()
+
+    result.update({f"plot_render_{k}": v for k, v in percentiles(timed(cold_plot, repeat), 1e3, "ms").items()})
+    result.update({f"plot_cached_{k}": v for k, v in percentiles(timed(plot, repeat * 5), 1e3, "ms").items()})
+    result["plot_render_peak_mb"] = peak_memory(cold_plot)
+    return result
+
+
+def run(quick=False):
+    import anfis_predict
+    import fuzzy_logic
+
+    sizes = [1_000, 10_000] if quick else [1_000, 10_000, 100_000]
+    calls, repeat = (200, 3) if quick else (1000, 5)
+
+    suites = {
+        "fuzzy_predict": lambda: bench_latency(fuzzy_logic, calls),
+        "anfis_predict": lambda: bench_latency(anfis_predict, calls),
+        "fuzzy_batch": lambda: bench_throughput(fuzzy_logic, sizes, repeat),
+        "anfis_batch": lambda: bench_throughput(anfis_predict, sizes, repeat),
+        "fuzzy_predictor_file": lambda: bench_fuzzy_predictor(sizes[-1], repeat),
+        "routes": lambda: bench_routes([250, 20_000] if quick else [250, 20_000, 200_000], repeat),
+    }
+
+    results = {}
+    for name, suite in suites.items():
+        start = time.perf_counter()
+        results[name] = suite()
+        print(f"{name}: done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "quick": quick,
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    # Rows of (suite, metric, baseline, current, change, regressed)
+    rows = []
+    for suite, metrics in current["results"].items():
+        for metric, value in metrics.items():
+            before = baseline.get("results", {}).get(suite, {}).get(metric)
+            if before is None or before == 0:
+                continue
+            higher_is_better = metric.endswith("_per_sec")
+            gated = not any(tail in metric for tail in ("p95_", "p99_"))
+            change = value / before - 1
+            worse = -change if higher_is_better else change
+            rows.append((suite, metric, before, value, change, gated and worse > tolerance))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the predictors, batch tool and web routes")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write this run's results")
+    parser.add_argument("--baseline", help="Results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown per metric before failing, as a fraction (default 0.25)")
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes, for CI smoke runs")
+    args = parser.parse_args()
+
+    current = run(args.quick)
+    with open(args.output, "w") as f:
+        json.dump(current, f, indent=1)
+    print(json.dumps(current["results"], indent=1))
+    print(f"✅ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in ("platform", "cpu_count", "quick"):
+            if baseline.get("meta", {}).get(key) != current["meta"][key]:
+                print(f"⚠️ Baseline {key} differs: {baseline.get('meta', {}).get(key)} vs {current['meta'][key]}")
+        rows = compare(current, baseline, args.tolerance)
+        regressions = [row for row in rows if row[5]]
+        for suite, metric, before, value, change, regressed in rows:
+            print(f"{'❌' if regressed else '  '} {suite}.{metric}: {before:,.2f} -> {value:,.2f} ({change:+.1%})")
+        if regressions:
+            sys.exit(f"❌ {len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+        print(f"✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+import tempfile
+import numpy as np
+
+# Compare the exported NumPy forward pass against model.predict. The export
+# math is checked on a small model with finite weights built here, since a
+# model with NaN weights (e.g. one trained on too little data) gives NaN on
+# both paths and would pass whatever the export did. The shipped model and
+# its exports are compared too when its weights are finite.
+import tensorflow as tf
+from joblib import dump, load
+
+import anfis_predict
+import anfis_train
+
+rng = np.random.default_rng(7)
+n = 5000
+close = rng.uniform(10, 500, n)
+low = close * rng.uniform(0.9, 1.0, n)
+high = close * rng.uniform(1.0, 1.1, n)
+volume = rng.uniform(1e5, 2e8, n)
+rsi = rng.uniform(0, 100, n)
+rows = anfis_predict.features(close, volume, high, low, rsi).copy()
+
+
+def compare(model, scaler, exports):
+    # True if every export in `exports` matches model.predict on `rows`
+    expected = model.predict(scaler.transform(rows), verbose=0)
+    failed = False
+    for path in exports:
+        if not os.path.exists(path):
+            print(f"⚠️ {path} not found, run export_anfis_weights.py first")
+            failed = True
+            continue
+
+        # Raw rows: the exported scaler is folded into the first layer on load
+        anfis_predict.load_weights(path)
+        preds = anfis_predict.forward(rows)
+
+        nan_mismatch = int((np.isnan(preds) != np.isnan(expected)).sum())
+        max_diff = np.nan_to_num(np.abs(preds - expected)).max()
+        agreement = (preds.argmax(axis=1) == expected.argmax(axis=1)).mean()
+        print(f"{os.path.basename(path)}: max probability difference {max_diff:.2e}, NaN mismatches {nan_mismatch}, "
+              f"label agreement {agreement * 100:.2f}%")
+        tolerance = 1e-2 if "fp16" in path else 1e-5
+        failed |= (nan_mismatch > 0 or np.isnan(preds).any() or max_diff > tolerance
+                   or (tolerance < 1e-2 and agreement < 1))
+    return not failed
+
+
+# A freshly initialised model (finite random weights) with a scaler that
+# actually moves the inputs, exported at both precisions
+tf.keras.utils.set_random_seed(7)
+model = anfis_train.build_model()
+scaler = anfis_train.make_scaler(n, rows.mean(axis=0), rows.std(axis=0))
+with tempfile.TemporaryDirectory() as tmp:
+    model_path, scaler_path = os.path.join(tmp, "model.h5"), os.path.join(tmp, "scaler.pkl")
+    model.save(model_path)
+    dump(scaler, scaler_path)
+    exports = [os.path.join(tmp, "weights.npz"), os.path.join(tmp, "weights_fp16.npz")]
+    for out, extra in zip(exports, ([], ["--float16"])):
+        subprocess.run([sys.executable, "export_anfis_weights.py", "--model", model_path, "--scaler", scaler_path,
+                        "--out", out, *extra], check=True, stdout=subprocess.DEVNULL)
+    ok = compare(model, scaler, exports)
+
+shipped = tf.keras.models.load_model("anfis_model.h5", compile=False)
+if anfis_train.finite_weights(shipped):
+    ok &= compare(shipped, load("scaler.pkl"), ["anfis_weights.npz", "anfis_weights_fp16.npz"])
+else:
+    print("⚠️ anfis_model.h5 has non-finite weights, so its exports were not compared; retrain it")
+
+if not ok:
+    print("❌ NumPy export does not match the Keras model")
+    sys.exit(1)
+print("✅ NumPy export matches the Keras model")
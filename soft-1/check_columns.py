@@ -1,4 +1,4 @@
-import pandas as pd
+import columnar
 
-df = pd.read_csv("stock_inputs.csv")
+df = columnar.read_table(columnar.resolve("stock_inputs.csv"))
 print("Your CSV columns are:", df.columns.tolist())
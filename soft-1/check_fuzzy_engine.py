@@ -0,0 +1,55 @@
+import sys
+import time
+import numpy as np
+from skfuzzy import control as ctrl
+
+import fuzzy_logic
+import rule_base
+
+# Compare the NumPy engine against skfuzzy's own simulation
+stock_ctrl = rule_base.control_system()
+rng = np.random.default_rng(42)
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+samples = np.column_stack([
+    rng.uniform(-12, 12, n),
+    rng.uniform(-120, 120, n),
+    rng.uniform(-5, 105, n),
+    rng.uniform(-6, 6, n),
+])
+# Add exact breakpoints, where ties and zero-firing cases live
+grid = np.array(np.meshgrid([-10, -5, -2, 0, 2, 5, 10], [-100, -40, -20, 0, 20, 40, 100],
+                            [0, 30, 35, 40, 50, 60, 65, 70, 100], [-5, -2, -1, 0, 1, 2, 5])).reshape(4, -1).T
+samples = np.vstack([samples, grid])
+
+start = time.perf_counter()
+expected = []
+for p, v, r, m in samples:
+    sim = ctrl.ControlSystemSimulation(stock_ctrl)
+    sim.input['price_change'] = p
+    sim.input['volume_change'] = v
+    sim.input['rsi'] = r
+    sim.input['ma_trend'] = m
+    sim.compute()
+    expected.append(sim.output.get('action', np.nan))
+expected = np.array(expected)
+skfuzzy_time = time.perf_counter() - start
+
+start = time.perf_counter()
+labels, outputs = fuzzy_logic.predict_batch(*samples.T)
+engine_time = time.perf_counter() - start
+
+both = ~np.isnan(expected) & ~np.isnan(outputs)
+max_diff = np.abs(outputs[both] - expected[both]).max()
+nan_mismatch = int((np.isnan(expected) != np.isnan(outputs)).sum())
+label_mismatch = int((labels != fuzzy_logic.to_labels(expected)).sum())
+
+print(f"Samples: {len(samples)}")
+print(f"skfuzzy: {skfuzzy_time:.3f}s, NumPy engine: {engine_time:.4f}s")
+print(f"Max output difference: {max_diff:.2e}")
+print(f"Empty-output mismatches: {nan_mismatch}, label mismatches: {label_mismatch}")
+
+if max_diff > 1e-9 or nan_mismatch or label_mismatch:
+    print("❌ NumPy engine does not match skfuzzy")
+    sys.exit(1)
+print("✅ NumPy engine matches skfuzzy")
@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+from joblib import load
+
+# Confirm the ANFIS inputs are scaled the way the model was trained: the
+# saved scaler.pkl and the constants baked into the NumPy exports must match
+# the training record in <checkpoint-dir>/state.json (without one, a refit
+# over the training rows, as anfis_train.py would compute it).
+parser = argparse.ArgumentParser(description="Check the saved ANFIS scaler against the training scaler")
+parser.add_argument("--scaler", default="scaler.pkl")
+parser.add_argument("--weights", nargs="*", default=["anfis_weights.npz", "anfis_weights_fp16.npz"])
+parser.add_argument("--checkpoint-dir", default="anfis_checkpoints")
+args = parser.parse_args()
+
+state_path = os.path.join(args.checkpoint_dir, "state.json")
+if os.path.exists(state_path):
+    with open(state_path) as f:
+        state = json.load(f)
+    mean, scale = np.array(state["mean"]), np.array(state["scale"])
+    print(f"Training scaler from {state_path}")
+else:
+    import columnar
+    from anfis_train import fit_scaler
+
+    _, _, mean, scale = fit_scaler([columnar.resolve("stock_inputs.csv")], 200_000, 0.2)
+    print(f"⚠️ No {state_path}; refitted the training scaler from stock_inputs")
+
+failed = False
+
+
+def compare(name, scale_found, offset_found):
+    # Everything is compared as X * scale + offset
+    global failed
+    expected_scale, expected_offset = 1 / scale, -mean / scale
+    diff = max(np.abs(scale_found - expected_scale).max(), np.abs(offset_found - expected_offset).max())
+    ok = np.allclose(scale_found, expected_scale, rtol=1e-9) and np.allclose(offset_found, expected_offset, rtol=1e-9)
+    print(f"{'✅' if ok else '❌'} {name}: max difference {diff:.3g}")
+    failed |= not ok
+
+
+scaler = load(args.scaler)
+if hasattr(scaler, "data_min_"):
+    print(f"❌ {args.scaler} is a MinMaxScaler; training uses a StandardScaler (rerun generate_scaler.py)")
+    failed = True
+else:
+    compare(args.scaler, 1 / scaler.scale_, -scaler.mean_ / scaler.scale_)
+
+for path in args.weights:
+    if not os.path.exists(path):
+        print(f"⚠️ {path} not found, skipped")
+        continue
+    exported = np.load(path)
+    compare(path, exported["scale"], exported["offset"])
+
+if failed:
+    print("❌ Saved scaling does not match training; rerun generate_scaler.py and export_anfis_weights.py")
+    sys.exit(1)
+print("✅ Saved scaling matches training")
@@ -0,0 +1,183 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Typed column bundles for the pipeline's intermediate tables. A bundle is a
+# directory (conventionally <name>.cols) holding schema.json plus one raw
+# little-endian file per column, so a reader memory-maps the columns instead
+# of parsing text. CSV stays the interchange format; read_table/write_table
+# accept either and pick by path.
+
+bundle_suffix = ".cols"
+format_name = "soft-columns"
+format_version = 1
+
+# Known columns and their storage types; other columns keep their own dtype
+schema = {
+    "Price Change %": {"dtype": "<f8", "description": "Daily close-to-close change, percent"},
+    "Volume Change %": {"dtype": "<f8", "description": "Daily volume change, percent"},
+    "MA Trend": {"dtype": "<f8", "description": "5-day minus 10-day moving average of close"},
+    "RSI": {"dtype": "<f8", "description": "14-day Wilder RSI, 0-100"},
+    "Label": {"dtype": "<i1", "description": "Training label", "values": [-1, 0, 1]},
+    "Recommendation": {"dtype": "<U5", "description": "Fuzzy recommendation",
+                       "values": ["Buy", "Hold", "Sell", "Error"]},
+    "Prediction": {"dtype": "<U4", "description": "ANFIS prediction", "values": ["Buy", "Hold", "Sell"]},
+}
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def is_bundle(path):
+    return os.path.isdir(path) or str(path).endswith(bundle_suffix)
+
+
+def bundle_path(path):
+    # stock_inputs.csv -> stock_inputs.cols
+    return os.path.splitext(path)[0] + bundle_suffix
+
+
+def resolve(path):
+    # The bundle next to a CSV, if it is at least as new; otherwise the CSV
+    bundle = bundle_path(path)
+    if os.path.exists(os.path.join(bundle, "schema.json")):
+        if not os.path.exists(path) or os.path.getmtime(bundle) >= os.path.getmtime(path):
+            return bundle
+    return path
+
+
+def _column_dtype(name, values):
+    if name in schema:
+        return np.dtype(schema[name]["dtype"])
+    values = np.asarray(values)
+    if values.dtype.kind in "OUST":
+        width = max((len(str(v)) for v in values), default=1)
+        return np.dtype(f"<U{max(width, 1)}")
+    return values.dtype.newbyteorder("<") if values.dtype.byteorder == ">" else values.dtype
+
+
+def _to_storage(name, values, dtype):
+    values = np.asarray(values)
+    if dtype.kind == "U":
+        values = np.array(["" if pd.isna(v) else str(v) for v in values], dtype=object)
+        if len(values) and max(len(v) for v in values) > dtype.itemsize // 4:
+            raise SchemaError(f"{name!r} has values longer than {dtype}")
+    elif dtype.kind in "iu":
+        if np.isnan(values.astype(float)).any():
+            raise SchemaError(f"{name!r} has missing values but is stored as {dtype}")
+    allowed = schema.get(name, {}).get("values")
+    if allowed is not None and dtype.kind in "iu" and not np.isin(values, allowed).all():
+        raise SchemaError(f"{name!r} has values outside {allowed}")
+    return values.astype(dtype)
+
+
+class BundleWriter:
+    # Appends DataFrame chunks column by column; the bundle only appears at
+    # path once close() has written the schema
+    def __init__(self, path):
+        self.path = path
+        self.tmp = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        os.makedirs(self.tmp)
+        self.columns = None
+        self.rows = 0
+
+    def append(self, frame):
+        if self.columns is None:
+            self.columns = [{"name": str(name), "file": f"{i}.bin",
+                             "dtype": _column_dtype(name, frame[name]).str}
+                            for i, name in enumerate(frame.columns)]
+        if [c["name"] for c in self.columns] != [str(name) for name in frame.columns]:
+            raise SchemaError("Chunk columns differ from the first chunk")
+
+        for column, name in zip(self.columns, frame.columns):
+            data = _to_storage(name, frame[name].to_numpy(), np.dtype(column["dtype"]))
+            with open(os.path.join(self.tmp, column["file"]), "ab") as f:
+                f.write(data.tobytes())
+        self.rows += len(frame)
+
+    def close(self):
+        meta = {"format": format_name, "version": format_version, "rows": self.rows,
+                "columns": [{**column, **{k: v for k, v in schema.get(column["name"], {}).items() if k != "dtype"}}
+                            for column in self.columns or []]}
+        with open(os.path.join(self.tmp, "schema.json"), "w") as f:
+            json.dump(meta, f, indent=1)
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close() if exc_type is None else self.abort()
+
+
+def write_bundle(path, frame):
+    with BundleWriter(path) as writer:
+        writer.append(frame)
+
+
+def read_schema(path):
+    with open(os.path.join(path, "schema.json")) as f:
+        meta = json.load(f)
+    if meta.get("format") != format_name or meta.get("version") != format_version:
+        raise SchemaError(f"{path} is not a version {format_version} {format_name} bundle")
+    return meta
+
+
+def read_bundle(path, columns=None):
+    # {name: read-only memmap}, checked against the known-column schema
+    meta = read_schema(path)
+    by_name = {column["name"]: column for column in meta["columns"]}
+    missing = [name for name in columns or [] if name not in by_name]
+    if missing:
+        raise SchemaError(f"{path} has no column(s) {missing}")
+
+    arrays = {}
+    for name in columns or list(by_name):
+        column = by_name[name]
+        dtype = np.dtype(column["dtype"])
+        if name in schema and dtype != np.dtype(schema[name]["dtype"]):
+            raise SchemaError(f"{name!r} is stored as {dtype}, expected {schema[name]['dtype']}")
+        file = os.path.join(path, column["file"])
+        if os.path.getsize(file) != meta["rows"] * dtype.itemsize:
+            raise SchemaError(f"{file} does not hold {meta['rows']} {dtype} values")
+        arrays[name] = (np.memmap(file, dtype=dtype, mode="r", shape=(meta["rows"],))
+                        if meta["rows"] else np.empty(0, dtype=dtype))
+    return arrays
+
+
+def _frame(arrays, start=0):
+    rows = len(next(iter(arrays.values()))) if arrays else 0
+    return pd.DataFrame(arrays, index=pd.RangeIndex(start, start + rows), copy=False)
+
+
+def read_table(path, columns=None):
+    if is_bundle(path):
+        return _frame(read_bundle(path, columns))
+    return pd.read_csv(path, usecols=columns)
+
+
+def write_table(frame, path):
+    if is_bundle(path):
+        write_bundle(path, frame)
+    else:
+        frame.to_csv(path, index=False)
+
+
+def iter_chunks(path, chunk_size, columns=None):
+    # Row chunks as DataFrames; bundle chunks are slices of the memmaps
+    if not is_bundle(path):
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns)
+        return
+    arrays = read_bundle(path, columns)
+    rows = len(next(iter(arrays.values()))) if arrays else 0
+    for start in range(0, rows, chunk_size):
+        yield _frame({name: values[start:start + chunk_size] for name, values in arrays.items()}, start)
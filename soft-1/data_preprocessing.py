@@ -1,31 +1,33 @@
-import yfinance as yf
+import sys
+
 import pandas as pd
 import numpy as np
 
-# Download stock data (e.g., Apple - AAPL)
-data = yf.download("AAPL", start="2023-01-01", end="2023-12-31")
-
-# Calculate technical indicators
-data['Price Change %'] = data['Close'].pct_change() * 100
-data['Volume Change %'] = data['Volume'].pct_change() * 100
-data['5D MA'] = data['Close'].rolling(window=5).mean()
-data['10D MA'] = data['Close'].rolling(window=10).mean()
-data['MA Trend'] = data['5D MA'] - data['10D MA']
-
-# RSI calculation
-def calculate_rsi(series, period=14):
-    delta = series.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-    rs = avg_gain / avg_loss
-    return 100 - (100 / (1 + rs))
-
-data['RSI'] = calculate_rsi(data['Close'])
+import columnar
+import indicators
+import market_data
+
+# Download stock data (e.g., Apple - AAPL; pass more symbols as arguments).
+# Symbols load in parallel and are cached under market_cache/.
+symbols = sys.argv[1:] or ["AAPL"]
+history = market_data.load_many(symbols, start="2023-01-01", end="2023-12-31")
+
+# Calculate technical indicators (price/volume change %, 5D - 10D MA trend, Wilder RSI)
+# per symbol, so windows never span two symbols
+frames = []
+for symbol in symbols:
+    if symbol not in history:
+        continue
+    data = history[symbol]
+    for name, values in indicators.compute(data['Close'].to_numpy(), data['Volume'].to_numpy()).items():
+        data[name] = values
+    frames.append(data)
+
+if not frames:
+    sys.exit("No market data loaded")
 
 # Drop NaN values
-data = data.dropna()
+data = pd.concat(frames).dropna()
 
 # Add Label column for classification
 def label_output(row):
@@ -44,5 +46,6 @@ data = data[['Price Change %', 'Volume Change %', 'MA Trend', 'RSI', 'Label']]
 # Preview first few rows
 print(data.head())
 
-# Save to CSV
-data.to_csv("stock_inputs.csv", index=False)
+# Save to CSV for interchange, and as a typed column bundle for the next stages
+columnar.write_table(data, "stock_inputs.csv")
+columnar.write_table(data, columnar.bundle_path("stock_inputs.csv"))
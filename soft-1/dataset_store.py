@@ -0,0 +1,126 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+
+class Dataset:
+    # Parsed, date-sorted upload held as compact NumPy columns
+    def __init__(self, columns, created=None):
+        self.columns = columns
+        self.created = time.time() if created is None else created
+        self.nbytes = sum(c.nbytes for c in columns.values())
+
+        digest = hashlib.sha256()
+        for name in sorted(columns):
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(columns[name]).tobytes())
+        self.digest = digest.hexdigest()
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+
+class DatasetStore:
+    # Uploads keyed by a random ID, expiring ttl seconds after upload. Each
+    # upload is written to `directory` as it is stored and read back from
+    # there on a miss, so every process sharing the directory (e.g. all
+    # gunicorn workers) can serve any upload. Memory holds the most recently
+    # used ones, up to max_bytes; files past the TTL are swept from the
+    # directory at most every sweep_interval seconds.
+    def __init__(self, directory, ttl=3600, max_bytes=256 * 1024 * 1024, sweep_interval=60):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def put(self, columns):
+        dataset_id = uuid.uuid4().hex
+        dataset = Dataset(columns)
+        self._write(dataset_id, dataset)
+        with self._lock:
+            self._insert(dataset_id, dataset)
+        self._sweep()
+        return dataset_id
+
+    def get(self, dataset_id):
+        with self._lock:
+            self._expire()
+            dataset = self._items.get(dataset_id)
+            if dataset is not None:
+                self._items.move_to_end(dataset_id)
+                return dataset
+
+        # Stored by this or another process; read outside the lock
+        dataset = self._read(dataset_id)
+        if dataset is not None:
+            with self._lock:
+                self._insert(dataset_id, dataset)
+        return dataset
+
+    def _insert(self, dataset_id, dataset):
+        # Evicted datasets are already on disk, so eviction only frees memory
+        if dataset_id in self._items:
+            self.size -= self._items.pop(dataset_id).nbytes
+        self._items[dataset_id] = dataset
+        self.size += dataset.nbytes
+        self._expire()
+        while self.size > self.max_bytes and len(self._items) > 1:
+            _, evicted = self._items.popitem(last=False)
+            self.size -= evicted.nbytes
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for dataset_id in [k for k, d in self._items.items() if d.created < cutoff]:
+            self.size -= self._items.pop(dataset_id).nbytes
+
+    def _path(self, dataset_id):
+        # IDs come from URLs, so only ever use the hex part
+        return os.path.join(self.directory, f"{dataset_id}.npz") if dataset_id.isalnum() else None
+
+    def _write(self, dataset_id, dataset):
+        # Written under a temporary name and renamed, so a reader in another
+        # process never sees a half-written file
+        path = self._path(dataset_id)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, _created=np.array(dataset.created), **dataset.columns)
+        os.replace(tmp, path)
+
+    def _read(self, dataset_id):
+        path = self._path(dataset_id)
+        if not path:
+            return None
+        try:
+            with np.load(path) as data:
+                created = float(data["_created"])
+                columns = {name: data[name] for name in data.files if name != "_created"}
+        except (FileNotFoundError, ValueError, OSError):  # Missing, swept, or unreadable
+            return None
+        if created < time.time() - self.ttl:
+            return None
+        return Dataset(columns, created)
+
+    def _sweep(self):
+        # Delete expired files, including temporaries left by a crashed writer
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < now - self.ttl:
+                    os.remove(path)
+            except OSError:  # Removed by another process meanwhile
+                pass
@@ -0,0 +1,73 @@
+import numpy as np
+
+# Shape-preserving downsampling for plots. A figure a few hundred pixels
+# wide cannot show more points than it has pixels, so long series are
+# reduced to about that many before drawing, keeping the peaks and troughs
+# a naive stride would skip. x may be numbers or datetime64.
+
+
+def _as_numbers(x):
+    x = np.asarray(x)
+    return x.astype("datetime64[ns]").astype(np.int64).astype(float) if np.issubdtype(x.dtype, np.datetime64) else x.astype(float)
+
+
+def lttb(x, y, n):
+    # Largest-Triangle-Three-Buckets: indices of n points (first and last
+    # always kept). Each bucket keeps the point forming the largest triangle
+    # with the point kept before it and the next bucket's average.
+    y = np.asarray(y, dtype=float)
+    if n >= len(y) or n < 3:
+        return np.arange(len(y))
+    xs = _as_numbers(x)
+
+    edges = np.linspace(1, len(y) - 1, n - 1).astype(int)  # n - 2 buckets between the end points
+    sums_x = np.add.reduceat(xs[1:-1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:-1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, xs[-1])[1:]  # Average of the bucket after each bucket
+    avg_y = np.append(sums_y / counts, y[-1])[1:]
+
+    keep = np.empty(n, dtype=np.intp)
+    keep[0], keep[-1] = 0, len(y) - 1
+    a = 0
+    for i in range(n - 2):
+        start, stop = edges[i], edges[i + 1]
+        area = np.abs((xs[a] - avg_x[i]) * (y[start:stop] - y[a]) - (xs[a] - xs[start:stop]) * (avg_y[i] - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def minmax(y, n):
+    # Indices of the minimum and maximum of each of n // 2 equal buckets, in
+    # order, plus the end points; fully vectorized
+    y = np.asarray(y, dtype=float)
+    buckets = max(n // 2, 1)
+    if n >= len(y):
+        return np.arange(len(y))
+    edges = np.linspace(0, len(y), buckets + 1).astype(int)
+    width = int(np.diff(edges).max())
+
+    # Pad each bucket to the same width so arg-min/max run on a 2-D view
+    index = edges[:-1, None] + np.arange(width)
+    valid = index < edges[1:, None]
+    values = y[np.minimum(index, len(y) - 1)]
+    low = np.where(valid, values, np.inf).argmin(axis=1) + edges[:-1]
+    high = np.where(valid, values, -np.inf).argmax(axis=1) + edges[:-1]
+    return np.unique(np.concatenate([[0, len(y) - 1], low, high]))
+
+
+def ohlc(dates, open_, high, low, close, volume, bars):
+    # Aggregate into at most `bars` bars of equal row counts: first open,
+    # highest high, lowest low, last close, summed volume, first date
+    n = len(close)
+    edges = np.unique(np.linspace(0, n, min(bars, n) + 1).astype(int))
+    starts, ends = edges[:-1], edges[1:] - 1
+    return {
+        "Date": np.asarray(dates)[starts],
+        "Open": np.asarray(open_, dtype=float)[starts],
+        "High": np.maximum.reduceat(np.asarray(high, dtype=float), starts),
+        "Low": np.minimum.reduceat(np.asarray(low, dtype=float), starts),
+        "Close": np.asarray(close, dtype=float)[ends],
+        "Volume": np.add.reduceat(np.asarray(volume, dtype=float), starts),
+    }
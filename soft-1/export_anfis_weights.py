@@ -0,0 +1,45 @@
+import argparse
+import json
+import h5py
+import numpy as np
+from joblib import load
+
+# Export the Dense weights of anfis_model.h5 and the scaler in scaler.pkl to a
+# small .npz, so anfis_predict can run without importing TensorFlow
+parser = argparse.ArgumentParser(description="Export the ANFIS model for the NumPy inference path")
+parser.add_argument("--model", default="anfis_model.h5")
+parser.add_argument("--scaler", default="scaler.pkl")
+parser.add_argument("--out", default=None, help="Default: anfis_weights.npz (anfis_weights_fp16.npz with --float16)")
+parser.add_argument("--float16", action="store_true", help="Store the weights as float16")
+args = parser.parse_args()
+
+out = args.out or ("anfis_weights_fp16.npz" if args.float16 else "anfis_weights.npz")
+dtype = np.float16 if args.float16 else np.float32
+exported = {}
+
+with h5py.File(args.model, "r") as f:
+    config = json.loads(f.attrs["model_config"])
+    layers = [layer["config"] for layer in config["config"]["layers"] if layer["class_name"] == "Dense"]
+    weights = f["model_weights"]
+
+    for i, layer in enumerate(layers):
+        group = weights[layer["name"]]
+        names = [n.decode() if isinstance(n, bytes) else n for n in group.attrs["weight_names"]]
+        kernel = next(group[n][()] for n in names if n.endswith("kernel"))
+        bias = next(group[n][()] for n in names if n.endswith("bias"))
+        exported[f"kernel_{i}"] = kernel.astype(dtype)
+        exported[f"bias_{i}"] = bias.astype(dtype)
+        exported[f"activation_{i}"] = np.array(layer["activation"])
+
+# Scaling as X * scale + offset, for either scaler type used in this repo
+scaler = load(args.scaler)
+if hasattr(scaler, "data_min_"):  # MinMaxScaler
+    scale, offset = scaler.scale_, scaler.min_
+else:  # StandardScaler
+    scale, offset = 1 / scaler.scale_, -scaler.mean_ / scaler.scale_
+exported["scale"] = np.asarray(scale, dtype=np.float64)
+exported["offset"] = np.asarray(offset, dtype=np.float64)
+exported["layers"] = np.array(len(layers))
+
+np.savez(out, **exported)
+print(f"✅ Exported {len(layers)} Dense layers ({np.dtype(dtype).name}) and scaler to {out}")
@@ -0,0 +1,83 @@
+import math
+
+import numpy as np
+
+from indicators import feature_columns
+
+# Predictor inputs derived from the latest bar(s), shared by fuzzy_logic and
+# anfis_predict so both engines see the same numbers. compute() fills a
+# (4, n) array, one row per feature in training order (feature_columns):
+#
+#   Price Change %   the given value, else the recovery from the bar's low,
+#                    (close - low) / low * 100
+#   Volume Change %  the given value, else the change against a 1M
+#                    baseline, (volume - 1e6) / 1e6 * 100
+#   MA Trend         the given value, else (close - typical) / typical * 10
+#   RSI              the given value, else 50
+#
+# The given values are the real indicators of a history (indicators.py), the
+# kind the model is trained on; the fallbacks only approximate them from a
+# single bar, in the same units. NaN in any given value means unknown and
+# takes the fallback. compute_one() is the same for a single bar in plain
+# float arithmetic (bit-identical), skipping the per-call NumPy overhead that
+# dominates at n = 1. compute() writes into `out` when given, else into a
+# new array the caller owns; anfis_predict reads it transposed, as (n, 4)
+# rows, without copying.
+PRICE_CHANGE, VOLUME_CHANGE, MA_TREND, RSI = range(len(feature_columns))
+
+
+def compute(close, volume, high, low, rsi=None, ma_trend=None, price_change=None, volume_change=None, out=None):
+    prices = [np.asarray(x, dtype=float) for x in (close, volume, high, low)]
+    if any(x.shape != prices[0].shape for x in prices):
+        prices = np.broadcast_arrays(*prices)
+    close, volume, high, low = (x.reshape(-1) for x in prices)
+    out = np.empty((len(feature_columns), len(close))) if out is None else out
+    price_row, volume_row, trend, rsi_value = out
+
+    np.subtract(close, low, out=price_row)
+    price_row /= low
+    price_row *= 100
+    if price_change is not None:
+        price_change = np.asarray(price_change, dtype=float)
+        np.copyto(price_row, price_change, where=~np.isnan(price_change))
+
+    np.subtract(volume, 1e6, out=volume_row)
+    volume_row /= 1e6
+    volume_row *= 100
+    if volume_change is not None:
+        volume_change = np.asarray(volume_change, dtype=float)
+        np.copyto(volume_row, volume_change, where=~np.isnan(volume_change))
+
+    # Typical price as a stand-in moving average, scaled for the -5..+5 range;
+    # the RSI row holds close - typical in between
+    np.add(high, low, out=trend)
+    trend += close
+    trend /= 3
+    np.subtract(close, trend, out=rsi_value)
+    rsi_value /= trend
+    np.multiply(rsi_value, 10, out=trend)
+    if ma_trend is not None:
+        ma_trend = np.asarray(ma_trend, dtype=float)
+        np.copyto(trend, ma_trend, where=~np.isnan(ma_trend))
+
+    if rsi is None:
+        rsi_value.fill(50)
+    else:
+        np.copyto(rsi_value, rsi)
+        np.copyto(rsi_value, 50, where=np.isnan(rsi_value))
+    return out
+
+
+def _known(value):
+    return value is not None and not math.isnan(value)
+
+
+def compute_one(close, volume, high, low, rsi=None, ma_trend=None, price_change=None, volume_change=None):
+    # compute() for one bar, as a (4,) array
+    close, volume, high, low = float(close), float(volume), float(high), float(low)
+    typical = (high + low + close) / 3
+    price = float(price_change) if _known(price_change) else (close - low) / low * 100
+    volume = float(volume_change) if _known(volume_change) else (volume - 1e6) / 1e6 * 100
+    trend = float(ma_trend) if _known(ma_trend) else (close - typical) / typical * 10
+    rsi = float(rsi) if _known(rsi) else 50.0
+    return np.array((price, volume, trend, rsi))
@@ -1,24 +1,24 @@
-import yfinance as yf
 import pandas as pd
 import datetime
 
+import columnar
+import indicators
+import market_data
+
 # Settings
 symbol = 'AAPL'  # You can change this to any stock symbol like 'TSLA', 'INFY.NS', etc.
 start_date = datetime.datetime.now() - datetime.timedelta(days=90)  # last 3 months
 end_date = datetime.datetime.now()
 
-# Fetch historical stock data
-data = yf.download(symbol, start=start_date, end=end_date, interval='1d')
+# Fetch historical stock data (cached locally; only new days are downloaded)
+data = market_data.load(symbol, start=start_date, end=end_date)
 
 # Drop rows with missing values
 data.dropna(inplace=True)
 
-# Calculate indicators
-data['Price Change %'] = data['Close'].pct_change() * 100
-data['Volume Change %'] = data['Volume'].pct_change() * 100
-data['MA Trend'] = data['Close'] - data['Close'].rolling(window=5).mean()
-data['RSI'] = 100 - (100 / (1 + data['Close'].pct_change().rolling(14).mean() /
-                                data['Close'].pct_change().rolling(14).std()))
+# Calculate indicators (same formulas as data_preprocessing.py)
+for name, values in indicators.compute(data['Close'].to_numpy(), data['Volume'].to_numpy()).items():
+    data[name] = values
 
 # Drop NA values created by rolling calculations
 data.dropna(inplace=True)
@@ -27,6 +27,7 @@ data.dropna(inplace=True)
 latest = data.iloc[-1][['Price Change %', 'Volume Change %', 'MA Trend', 'RSI']]
 latest_df = pd.DataFrame([latest])
 
-# Save to CSV
-latest_df.to_csv('stock_inputs.csv', index=False)
+# Save to CSV, plus the typed column bundle the later stages prefer
+columnar.write_table(latest_df, 'stock_inputs.csv')
+columnar.write_table(latest_df, columnar.bundle_path('stock_inputs.csv'))
 print("Data saved to stock_inputs.csv")
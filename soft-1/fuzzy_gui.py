@@ -1,66 +1,99 @@
+import functools
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import messagebox, ttk
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import pandas as pd
-import yfinance as yf
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
 from collections import Counter
 
-# Fuzzy Logic System
-price_change = ctrl.Antecedent(np.arange(-10, 11, 1), 'price_change')
-volume_change = ctrl.Antecedent(np.arange(-100, 101, 10), 'volume_change')
-rsi = ctrl.Antecedent(np.arange(0, 101, 1), 'rsi')
-ma_trend = ctrl.Antecedent(np.arange(-5, 6, 1), 'ma_trend')
-action = ctrl.Consequent(np.arange(-1, 2, 1), 'action')
-
-price_change['negative'] = fuzz.trapmf(price_change.universe, [-10, -10, -5, 0])
-price_change['stable'] = fuzz.trimf(price_change.universe, [-2, 0, 2])
-price_change['positive'] = fuzz.trapmf(price_change.universe, [0, 5, 10, 10])
-
-volume_change['low'] = fuzz.trapmf(volume_change.universe, [-100, -100, -40, 0])
-volume_change['medium'] = fuzz.trimf(volume_change.universe, [-20, 0, 20])
-volume_change['high'] = fuzz.trapmf(volume_change.universe, [0, 40, 100, 100])
-
-rsi['oversold'] = fuzz.trapmf(rsi.universe, [0, 0, 30, 40])
-rsi['neutral'] = fuzz.trimf(rsi.universe, [35, 50, 65])
-rsi['overbought'] = fuzz.trapmf(rsi.universe, [60, 70, 100, 100])
-
-ma_trend['falling'] = fuzz.trapmf(ma_trend.universe, [-5, -5, -2, 0])
-ma_trend['flat'] = fuzz.trimf(ma_trend.universe, [-1, 0, 1])
-ma_trend['rising'] = fuzz.trapmf(ma_trend.universe, [0, 2, 5, 5])
-
-action['sell'] = fuzz.trimf(action.universe, [-1, -1, 0])
-action['hold'] = fuzz.trimf(action.universe, [-0.5, 0, 0.5])
-action['buy'] = fuzz.trimf(action.universe, [0, 1, 1])
-
-rules = [
-    ctrl.Rule(price_change['positive'] & rsi['overbought'], action['sell']),
-    ctrl.Rule(price_change['negative'] & rsi['oversold'], action['buy']),
-    ctrl.Rule(price_change['stable'] & rsi['neutral'], action['hold']),
-    ctrl.Rule(price_change['positive'] & volume_change['high'], action['sell']),
-    ctrl.Rule(price_change['negative'] & volume_change['high'], action['buy']),
-    ctrl.Rule(ma_trend['rising'] & rsi['neutral'], action['buy']),
-    ctrl.Rule(ma_trend['falling'] & rsi['neutral'], action['sell']),
-    ctrl.Rule(ma_trend['rising'] & price_change['positive'], action['buy']),
-    ctrl.Rule(ma_trend['falling'] & price_change['negative'], action['sell']),
-    ctrl.Rule(volume_change['low'] & rsi['overbought'], action['sell']),
-    ctrl.Rule(volume_change['low'] & rsi['oversold'], action['buy']),
-    ctrl.Rule(price_change['stable'] & ma_trend['flat'], action['hold']),
-    ctrl.Rule(price_change['positive'] & rsi['neutral'] & volume_change['medium'], action['hold']),
-    ctrl.Rule(price_change['negative'] & rsi['neutral'] & volume_change['medium'], action['hold']),
-    ctrl.Rule(ma_trend['rising'] & rsi['oversold'], action['buy']),
-    ctrl.Rule(ma_trend['falling'] & rsi['overbought'], action['sell']),
-]
-
-stock_ctrl = ctrl.ControlSystem(rules)
-stock_sim = ctrl.ControlSystemSimulation(stock_ctrl)
+import fuzzy_logic
+import indicators
+import market_data
 
 # Track predictions for pie chart
 prediction_history = []
 
+# Chart data is loaded, and every bar scored, on a background thread so the
+# window never freezes; results are cached per symbol and date range. The Tk
+# main thread only polls for the result and updates the chart's existing
+# artists. fuzzy_logic.predict_batch reads the shared compiled rule base
+# without changing it, so the worker and the Predict button can both use it.
+chart_range = ("2024-01-01", "2024-04-01")
+label_colors = {"Buy": "green", "Hold": "blue", "Sell": "red"}
+loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart-loader")
+
+
+@functools.lru_cache(maxsize=32)
+def load_history(symbol, start, end):
+    # Dates, RSI and the fuzzy label of every bar with complete indicators
+    data = market_data.load(symbol, start=start, end=end)
+    features = indicators.compute(data['Close'].to_numpy(), data['Volume'].to_numpy())
+    labels = np.full(len(data), "", dtype=object)
+    complete = ~np.isnan(np.column_stack([features[c] for c in indicators.feature_columns])).any(axis=1)
+    if complete.any():
+        scored, _ = fuzzy_logic.predict_batch(features['Price Change %'][complete], features['Volume Change %'][complete],
+                                              features['RSI'][complete], features['MA Trend'][complete])
+        labels[complete] = scored
+    return data.index.to_numpy(), features['RSI'], labels
+
+
+class ChartWindow:
+    # One window, figure and set of artists, updated in place on each load
+    def __init__(self, master):
+        self.window = tk.Toplevel(master)
+        self.window.title("Stock Prediction Charts")
+
+        self.figure = Figure(figsize=(10, 4))
+        self.rsi_axes, self.pie_axes = self.figure.subplots(1, 2)
+
+        # RSI Line Plot, with the fuzzy Buy/Sell signals of each bar
+        self.rsi_axes.xaxis_date()
+        self.rsi_line, = self.rsi_axes.plot([], [], color='purple')
+        self.signals = {label: self.rsi_axes.scatter([], [], color=label_colors[label], marker=marker, label=label, zorder=3)
+                        for label, marker in (("Buy", "^"), ("Sell", "v"))}
+        self.rsi_axes.axhline(70, color='red', linestyle='--')
+        self.rsi_axes.axhline(30, color='green', linestyle='--')
+        self.rsi_axes.set_title("RSI Trend")
+        self.rsi_axes.set_xlabel("Date")
+        self.rsi_axes.set_ylabel("RSI")
+        self.rsi_axes.legend(loc="upper left")
+
+        self.pie_counts = None
+        self.figure.tight_layout()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.window)
+        self.canvas.get_tk_widget().pack()
+
+    def alive(self):
+        return bool(self.window.winfo_exists())
+
+    def set_history(self, symbol, dates, rsi, labels):
+        self.rsi_line.set_data(dates, rsi)
+        for label, points in self.signals.items():
+            hit = labels == label
+            points.set_offsets(np.column_stack([self.rsi_axes.convert_xunits(dates[hit]), rsi[hit]]))
+        self.rsi_axes.relim()
+        self.rsi_axes.autoscale_view()
+        self.rsi_axes.set_title(f"RSI Trend ({symbol})")
+        self.canvas.draw_idle()
+
+    def set_predictions(self, history):
+        # The pie has only a few wedges; redrawn only when the counts change
+        counts = Counter(history)
+        if counts == self.pie_counts:
+            return
+        self.pie_counts = counts
+        self.pie_axes.clear()
+        labels = [label for label in label_colors if counts[label]]
+        self.pie_axes.pie([counts[label] for label in labels], labels=labels, autopct='%1.1f%%', startangle=140,
+                          colors=[label_colors[label] for label in labels])
+        self.pie_axes.set_title("Buy/Sell/Hold Distribution")
+        self.canvas.draw_idle()
+
+
+chart = None
+
+
 # GUI Functions
 def predict_action():
     try:
@@ -69,70 +102,58 @@ def predict_action():
         r = float(rsi_entry.get())
         m = float(ma_entry.get())
 
-        stock_sim.input['price_change'] = p
-        stock_sim.input['volume_change'] = v
-        stock_sim.input['rsi'] = r
-        stock_sim.input['ma_trend'] = m
-        stock_sim.compute()
-
-        result = stock_sim.output['action']
-        if result > 0.3:
-            msg = "Recommendation: BUY"
-            prediction_history.append("Buy")
-        elif result < -0.3:
-            msg = "Recommendation: SELL"
-            prediction_history.append("Sell")
-        else:
-            msg = "Recommendation: HOLD"
-            prediction_history.append("Hold")
+        # Same rule base and thresholds as the web app (rule_base.json)
+        labels, outputs = fuzzy_logic.predict_batch(p, v, r, m)
+        if np.isnan(outputs[0]):
+            raise ValueError("No fuzzy rule fired for these inputs")
+
+        msg = f"Recommendation: {labels[0].upper()}"
+        prediction_history.append(labels[0])
 
         result_label.config(text=msg)
+        if chart is not None and chart.alive():
+            chart.set_predictions(prediction_history)
     except Exception as e:
         messagebox.showerror("Input Error", str(e))
 
 def show_charts():
-    chart_window = tk.Toplevel(root)
-    chart_window.title("Stock Prediction Charts")
-
-    # RSI Line Plot
-    fig, axs = plt.subplots(1, 2, figsize=(10, 4))
-
-    # Download data and compute RSI
-    data = yf.download("AAPL", start="2024-01-01", end="2024-04-01")
-    data['Change'] = data['Close'].diff()
-
-    def compute_rsi(data, window=14):
-        delta = data['Change']
-        gain = delta.where(delta > 0, 0).rolling(window=window).mean()
-        loss = -delta.where(delta < 0, 0).rolling(window=window).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
-
-    data['RSI'] = compute_rsi(data)
-
-    axs[0].plot(data.index, data['RSI'], color='purple')
-    axs[0].axhline(70, color='red', linestyle='--')
-    axs[0].axhline(30, color='green', linestyle='--')
-    axs[0].set_title("RSI Trend")
-    axs[0].set_xlabel("Date")
-    axs[0].set_ylabel("RSI")
-
-    # Pie chart
-    counts = Counter(prediction_history)
-    axs[1].pie(counts.values(), labels=counts.keys(), autopct='%1.1f%%', startangle=140, colors=['green', 'blue', 'red'])
-    axs[1].set_title("Buy/Sell/Hold Distribution")
-
-    fig.tight_layout()
+    global chart
+    if chart is None or not chart.alive():
+        chart = ChartWindow(root)
+    else:
+        chart.window.lift()
+    chart.set_predictions(prediction_history)
+
+    symbol = symbol_entry.get().strip().upper() or "AAPL"
+    status_label.config(text=f"Loading {symbol}...")
+    chart_button.config(state=tk.DISABLED)
+    progress.start(10)
+    poll_history(loader.submit(load_history, symbol, *chart_range), symbol)
+
+def poll_history(future, symbol):
+    if not future.done():
+        root.after(50, poll_history, future, symbol)
+        return
+
+    progress.stop()
+    chart_button.config(state=tk.NORMAL)
+    try:
+        dates, rsi, labels = future.result()
+    except Exception as e:
+        status_label.config(text="")
+        messagebox.showerror("Data Error", f"Could not load {symbol}: {e}")
+        return
 
-    canvas = FigureCanvasTkAgg(fig, master=chart_window)
-    canvas.draw()
-    canvas.get_tk_widget().pack()
+    scored = labels[labels != ""]
+    latest = f", latest signal {scored[-1]}" if len(scored) else ""
+    status_label.config(text=f"{symbol}: {len(dates)} bars{latest}")
+    if chart is not None and chart.alive():
+        chart.set_history(symbol, dates, rsi, labels)
 
 # GUI Layout
 root = tk.Tk()
 root.title("Stock Prediction Using Fuzzy Logic")
-root.geometry("400x450")
+root.geometry("400x540")
 
 tk.Label(root, text="Price Change (%)").pack()
 price_entry = tk.Entry(root)
@@ -154,6 +175,16 @@ tk.Button(root, text="Predict", command=predict_action, bg="blue", fg="white").p
 result_label = tk.Label(root, text="", font=('Arial', 14, 'bold'))
 result_label.pack(pady=10)
 
-tk.Button(root, text="Show Charts", command=show_charts, bg="green", fg="white").pack(pady=10)
+tk.Label(root, text="Chart Symbol").pack()
+symbol_entry = tk.Entry(root)
+symbol_entry.insert(0, "AAPL")
+symbol_entry.pack()
+
+chart_button = tk.Button(root, text="Show Charts", command=show_charts, bg="green", fg="white")
+chart_button.pack(pady=10)
+progress = ttk.Progressbar(root, mode="indeterminate", length=200)
+progress.pack()
+status_label = tk.Label(root, text="")
+status_label.pack(pady=5)
 
 root.mainloop()
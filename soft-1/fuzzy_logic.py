@@ -1,90 +1,314 @@
+import json
+import os
 import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
-
-# Define input variables
-price_change = ctrl.Antecedent(np.arange(-10, 11, 1), 'price_change')
-volume_change = ctrl.Antecedent(np.arange(-100, 101, 10), 'volume_change')
-rsi = ctrl.Antecedent(np.arange(0, 101, 1), 'rsi')
-ma_trend = ctrl.Antecedent(np.arange(-5, 6, 1), 'ma_trend')
-
-# Define output variable
-action = ctrl.Consequent(np.arange(-1, 2, 0.01), 'action')  # High resolution
-
-# Membership functions (Input)
-price_change['negative'] = fuzz.trapmf(price_change.universe, [-10, -10, -5, 0])
-price_change['stable'] = fuzz.trimf(price_change.universe, [-2, 0, 2])
-price_change['positive'] = fuzz.trapmf(price_change.universe, [0, 5, 10, 10])
-
-volume_change['low'] = fuzz.trapmf(volume_change.universe, [-100, -100, -40, 0])
-volume_change['medium'] = fuzz.trimf(volume_change.universe, [-20, 0, 20])
-volume_change['high'] = fuzz.trapmf(volume_change.universe, [0, 40, 100, 100])
-
-rsi['oversold'] = fuzz.trapmf(rsi.universe, [0, 0, 30, 40])
-rsi['neutral'] = fuzz.trimf(rsi.universe, [35, 50, 65])
-rsi['overbought'] = fuzz.trapmf(rsi.universe, [60, 70, 100, 100])
-
-ma_trend['falling'] = fuzz.trapmf(ma_trend.universe, [-5, -5, -2, 0])
-ma_trend['flat'] = fuzz.trimf(ma_trend.universe, [-1, 0, 1])
-ma_trend['rising'] = fuzz.trapmf(ma_trend.universe, [0, 2, 5, 5])
-
-# Membership functions (Output)
-action['sell'] = fuzz.trimf(action.universe, [-1, -1, 0])
-action['hold'] = fuzz.trimf(action.universe, [-0.5, 0, 0.5])
-action['buy'] = fuzz.trimf(action.universe, [0, 1, 1])
-
-# Define fuzzy rules
-rules = [
-    ctrl.Rule(price_change['positive'] & rsi['overbought'], action['sell']),
-    ctrl.Rule(price_change['negative'] & rsi['oversold'], action['buy']),
-    ctrl.Rule(price_change['stable'] & rsi['neutral'], action['hold']),
-    ctrl.Rule(price_change['positive'] & volume_change['high'], action['sell']),
-    ctrl.Rule(price_change['negative'] & volume_change['high'], action['buy']),
-    ctrl.Rule(ma_trend['rising'] & rsi['neutral'], action['buy']),
-    ctrl.Rule(ma_trend['falling'] & rsi['neutral'], action['sell']),
-    ctrl.Rule(ma_trend['rising'] & price_change['positive'], action['buy']),
-    ctrl.Rule(ma_trend['falling'] & price_change['negative'], action['sell']),
-    ctrl.Rule(volume_change['low'] & rsi['overbought'], action['sell']),
-    ctrl.Rule(volume_change['low'] & rsi['oversold'], action['buy']),
-    ctrl.Rule(price_change['stable'] & ma_trend['flat'], action['hold']),
-    ctrl.Rule(price_change['positive'] & rsi['neutral'] & volume_change['medium'], action['hold']),
-    ctrl.Rule(price_change['negative'] & rsi['neutral'] & volume_change['medium'], action['hold']),
-    ctrl.Rule(ma_trend['rising'] & rsi['oversold'], action['buy']),
-    ctrl.Rule(ma_trend['falling'] & rsi['overbought'], action['sell']),
-]
-
-# Build Mamdani Inference System
-stock_ctrl = ctrl.ControlSystem(rules)
-
-# Function to build a fresh simulation every time
-def predict(close, volume, high, low):
-    # Compute derived indicators
-    price_diff = ((close - low) / low) * 100
-    volume_diff = ((volume - 1e6) / 1e6) * 100
-    ma = (high + low + close) / 3
-    trend = ((close - ma) / ma) * 10  # Scale for -5 to +5 range
-    rsi_value = 50  # You can update this if you have actual RSI calculation
+
+import features
+import rule_base
+from prediction_cache import PredictionCache
+
+# The rule base (variables, membership functions, rules and Buy/Sell
+# thresholds) is defined in rule_base.json and loaded here precompiled, see
+# rule_base.py. rule_base.control_system() gives the equivalent skfuzzy
+# ControlSystem.
+engine = rule_base.load()
+
+
+def _crossings(engine, j, cut):
+    # Points where output term j crosses its cut level, interpolated the same
+    # way skfuzzy upsamples the universe. Output terms are tri/trap shaped, so
+    # the sampled mf rises to a peak and falls again: one crossing per side at
+    # most, found by binary search. Missing ones repeat universe[0], which
+    # only adds a zero-width segment.
+    universe, mf = engine['out_universe'], engine['out_mfs'][j]
+    peak, rising, falling = engine['out_shapes'][j]
+    zero = cut == 0  # skfuzzy uses mf > 0 for a zero cut, mf >= cut otherwise
+
+    first = np.where(zero, np.searchsorted(rising, cut, 'right'), np.searchsorted(rising, cut, 'left'))
+    below = np.where(zero, np.searchsorted(falling, cut, 'right'), np.searchsorted(falling, cut, 'left'))
+    last = peak + len(falling) - below - 1
+
+    points = []
+    for i, found in ((first - 1, first > 0), (last, last < len(universe) - 1)):
+        i = np.clip(i, 0, len(universe) - 2)
+        dmf = mf[i + 1] - mf[i]
+        dmf = np.where(dmf == 0, 1.0, dmf)
+        x = universe[i] + (cut - mf[i]) * (universe[i + 1] - universe[i]) / dmf
+        points.append(np.where(found, x, universe[0]))
+    return points
+
+
+def _segments(x1, y1, x2, y2):
+    # Area and first moment of a piecewise-linear segment
+    dx = x2 - x1
+    return 0.5 * dx * (y1 + y2), dx * (0.5 * x1 * (y1 + y2) + dx * (2 * y2 + y1) / 6)
+
+
+def _infer(engine, inputs):
+    n = inputs.shape[1]
+
+    # Fuzzify: one membership row per input term, plus the padding row of ones
+    members = np.ones((len(engine['in_mfs']) + 1, n))
+    for t, (v, universe, mf) in enumerate(zip(engine['in_vars'], engine['in_universes'], engine['in_mfs'])):
+        members[t] = np.interp(inputs[v], universe, mf)
+
+    # Rule firing (AND = min) and accumulation per output term (max)
+    firing = members[engine['rule_terms']].min(axis=1) * engine['rule_weight'][:, None]
+    out_mfs = engine['out_mfs']
+    cuts = np.zeros((len(out_mfs), n))
+    for j in range(len(out_mfs)):
+        cuts[j] = firing[engine['rule_out'] == j].max(axis=0)
+
+    # Clipped and aggregated output on the universe points
+    universe = engine['out_universe']
+    y = np.zeros((n, len(universe)))
+    for j, mf in enumerate(out_mfs):
+        np.maximum(y, np.minimum(cuts[j][:, None], mf), out=y)
+    area, moment = y @ engine['area_weights'], y @ engine['moment_weights']
+
+    # skfuzzy also adds the cut crossings as knots. Split the universe
+    # segments they fall into instead of re-sorting the whole universe.
+    extra = np.sort(np.column_stack([p for j in range(len(out_mfs)) for p in _crossings(engine, j, cuts[j])]), axis=1)
+    extra_y = np.zeros_like(extra)
+    for j, mf in enumerate(out_mfs):
+        np.maximum(extra_y, np.minimum(cuts[j][:, None], np.interp(extra, universe, mf)), out=extra_y)
+
+    rows = np.arange(n)[:, None]
+    seg = np.clip(np.searchsorted(universe, extra, 'right') - 1, 0, len(universe) - 2)
+    left_x, left_y = universe[seg], y[rows, seg]
+    right_x, right_y = universe[seg + 1], y[rows, seg + 1]
+    same = seg[:, 1:] == seg[:, :-1]
+    left_x[:, 1:] = np.where(same, extra[:, :-1], left_x[:, 1:])
+    left_y[:, 1:] = np.where(same, extra_y[:, :-1], left_y[:, 1:])
+    last = np.ones(seg.shape)
+    last[:, :-1] = ~same
+
+    for sign, parts in ((1, (left_x, left_y, extra, extra_y)),
+                        (last, (extra, extra_y, right_x, right_y)),
+                        (-last, (universe[seg], y[rows, seg], right_x, right_y))):
+        a, m = _segments(*parts)
+        area += (sign * a).sum(axis=1)
+        moment += (sign * m).sum(axis=1)
+
+    # Exact centroid of the piecewise-linear output, as skfuzzy computes it
+    output = moment / np.fmax(area, np.finfo(float).eps)
+
+    # No rule fired: skfuzzy has no output for these samples
+    output[(y.sum(axis=1) + extra_y.sum(axis=1)) == 0] = np.nan
+    return output
+
+
+def to_labels(outputs, thresholds=None):
+    buy, sell = engine['thresholds'] if thresholds is None else thresholds
+    outputs = np.asarray(outputs, dtype=float)
+    labels = np.where(outputs > buy, "Buy", np.where(outputs < sell, "Sell", "Hold")).astype(object)
+    labels[np.isnan(outputs)] = "Error"
+    return labels
+
+
+# Score many rows in one vectorized pass; returns (labels, crisp outputs)
+def predict_batch(price_change, volume_change, rsi, ma_trend, chunk_size=4096, engine=engine):
+    inputs = np.array(np.broadcast_arrays(price_change, volume_change, rsi, ma_trend), dtype=float).reshape(4, -1)
 
     # Clip values to the fuzzy universe ranges
-    price_diff = np.clip(price_diff, -10, 10)
-    volume_diff = np.clip(volume_diff, -100, 100)
-    trend = np.clip(trend, -5, 5)
-    rsi_value = np.clip(rsi_value, 0, 100)
-
-    # Initialize new simulation instance
-    sim = ctrl.ControlSystemSimulation(stock_ctrl)
-
-    sim.input['price_change'] = price_diff
-    sim.input['volume_change'] = volume_diff
-    sim.input['rsi'] = rsi_value
-    sim.input['ma_trend'] = trend
-
-    sim.compute()
-    fuzzy_output = sim.output['action']
-
-    if fuzzy_output > 0.3:
-        return "Buy"
-    elif fuzzy_output < -0.3:
-        return "Sell"
-    else:
-        return "Hold"
+    for v, (low, high) in enumerate(engine['bounds']):
+        np.clip(inputs[v], low, high, out=inputs[v])
+
+    outputs = np.empty(inputs.shape[1])
+    for start in range(0, inputs.shape[1], chunk_size):
+        outputs[start:start + chunk_size] = _infer(engine, inputs[:, start:start + chunk_size])
+
+    return to_labels(outputs, engine['thresholds']), outputs
+
+
+# Optional LUT mode: the controller is a fixed function of four clipped
+# inputs, so its surface can be sampled once on a 4-D grid (see
+# generate_fuzzy_lut.py) and answered by multilinear interpolation.
+# Set FUZZY_LUT=1 (default file) or FUZZY_LUT=<path> to enable it.
+lut_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fuzzy_lut.npy")
+lut = None
+
+# Offsets of the 16 corners of a 4-D grid cell
+_corners = np.array(np.meshgrid(*[[0, 1]] * 4, indexing='ij')).reshape(4, -1).T
+_corner_list = _corners.tolist()
+
+
+def lut_axes(shape):
+    return [np.linspace(low, high, n) for (low, high), n in zip(engine['bounds'], shape)]
+
+
+def build_lut(shape, dtype=np.float32):
+    if min(shape) < 2:
+        raise ValueError("Every LUT axis needs at least 2 points")
+    grid = np.meshgrid(*lut_axes(shape), indexing='ij')
+    _, outputs = predict_batch(*(g.ravel() for g in grid))
+    return outputs.reshape(shape).astype(dtype)
+
+
+def save_lut(table, path=lut_path):
+    # The table, plus a sidecar recording the rule-base version it samples
+    np.save(path, table)
+    with open(os.path.splitext(path)[0] + ".json", "w") as f:
+        json.dump({"rule_base_version": engine['version'], "shape": list(table.shape)}, f)
+
+
+def load_lut(path=lut_path):
+    # Memory-mapped read-only, so every worker process shares one copy.
+    # A table sampled from another rule-base version is refused.
+    global lut
+    try:
+        with open(os.path.splitext(path)[0] + ".json") as f:
+            built_from = json.load(f).get("rule_base_version")
+    except OSError:
+        built_from = None
+    if built_from != engine['version']:
+        raise ValueError(f"{path} was built for rule base {built_from}, not {engine['version']}; "
+                         f"rebuild it with generate_fuzzy_lut.py")
+    lut = np.load(path, mmap_mode='r').view(np.ndarray)
+    return lut
+
+
+def lut_predict_batch(price_change, volume_change, rsi, ma_trend, table=None, strict=True):
+    table = lut if table is None else table
+    inputs = np.array(np.broadcast_arrays(price_change, volume_change, rsi, ma_trend), dtype=float).reshape(4, -1).T
+
+    # Fractional grid position of every sample on each axis
+    low, high = np.array(engine['bounds'], dtype=float).T
+    size = np.array(table.shape)
+    pos = (np.clip(inputs, low, high) - low) / (high - low) * (size - 1)
+    cell = np.clip(np.floor(pos).astype(np.intp), 0, size - 2)
+    frac = pos - cell
+
+    # Weighted sum over the cell corners; corners with zero weight are
+    # skipped so an empty (NaN) neighbour does not spoil exact grid hits
+    idx = cell[:, None, :] + _corners
+    weights = np.where(_corners, frac[:, None, :], 1 - frac[:, None, :]).prod(axis=2)
+    values = np.asarray(table[idx[..., 0], idx[..., 1], idx[..., 2], idx[..., 3]], dtype=float)
+    used = weights > 0
+    outputs = np.where(used, weights * values, 0).sum(axis=1)
+
+    # The surface jumps where rules stop firing, so in strict mode cells
+    # whose corners disagree on the label give NaN for the caller to
+    # answer exactly instead
+    if strict:
+        buy, sell = engine['thresholds']
+        corner_labels = np.where(values > buy, 1, np.where(values < sell, -1, 0))
+        top = np.where(used, corner_labels, -2).max(axis=1)
+        bottom = np.where(used, corner_labels, 2).min(axis=1)
+        outputs[top != bottom] = np.nan
+
+    return to_labels(outputs), outputs
+
+
+# Scalar version of lut_predict_batch for single predictions, which would
+# otherwise spend most of their time in NumPy call overhead
+def lut_output(price_change, volume_change, rsi, ma_trend, table=None, strict=True):
+    table = lut if table is None else table
+    cell, frac = [], []
+    for x, (low, high), n in zip((price_change, volume_change, rsi, ma_trend), engine['bounds'], table.shape):
+        pos = (min(max(float(x), low), high) - low) / (high - low) * (n - 1)
+        i = min(int(pos), n - 2)
+        cell.append(i)
+        frac.append(pos - i)
+
+    output = 0.0
+    buy, sell = engine['thresholds']
+    labels = set()
+    for corner in _corner_list:
+        weight = 1.0
+        for c, f in zip(corner, frac):
+            weight *= f if c else 1 - f
+        if weight == 0:
+            continue
+        value = float(table[cell[0] + corner[0], cell[1] + corner[1], cell[2] + corner[2], cell[3] + corner[3]])
+        output += weight * value
+        labels.add(1 if value > buy else -1 if value < sell else 0)
+
+    if strict and len(labels) > 1:
+        return float('nan')
+    return output
+
+
+if os.environ.get("FUZZY_LUT"):
+    try:
+        load_lut(lut_path if os.environ["FUZZY_LUT"] == "1" else os.environ["FUZZY_LUT"])
+    except ValueError as e:
+        print(f"⚠️ LUT mode disabled: {e}")
+
+
+def use_rule_base(path=rule_base.definition_path):
+    # Switch to another rule-base file in place, so every holder of `engine`
+    # (and predict_batch's default) sees it; the LUT belongs to the old one
+    global lut
+    engine.clear()
+    engine.update(rule_base.load(path))
+    lut = None
+
+
+def version():
+    # What predictions currently depend on: the rule base, and LUT mode
+    return engine['version'] + (":lut" if lut is not None else "")
+
+
+# Memo of single predictions, keyed on the derived inputs (see
+# prediction_cache.py)
+cache = PredictionCache.from_env()
+
+
+def _predict_label(price_diff, volume_diff, rsi_value, trend):
+    # LUT cells touching an empty region or a label boundary fall back to
+    # the exact engine
+    if lut is not None:
+        output = lut_output(price_diff, volume_diff, rsi_value, trend)
+        if not np.isnan(output):
+            return to_labels(output)[()]
+
+    labels, outputs = predict_batch(price_diff, volume_diff, rsi_value, trend)
+    if np.isnan(outputs[0]):
+        raise ValueError("No fuzzy rule fired for these inputs")
+
+    return labels[0]
+
+
+def predict_row(row):
+    # One column of features.compute(): price change, volume change, MA
+    # trend, RSI
+    price_diff, volume_diff, trend, rsi_value = (float(x) for x in row)
+    if not cache.enabled:
+        return _predict_label(price_diff, volume_diff, rsi_value, trend)
+
+    # Inference always runs on the exact inputs
+    key = cache.key(price_diff, volume_diff, rsi_value, trend)
+    if None in key:
+        return _predict_label(price_diff, volume_diff, rsi_value, trend)
+    current = version()
+    label = cache.get(key, current)
+    if label is None:
+        label = _predict_label(price_diff, volume_diff, rsi_value, trend)
+        cache.put(key, current, label)
+    return label
+
+
+def predict(close, volume, high, low, rsi=None, ma_trend=None, price_change=None, volume_change=None):
+    # Derived inputs as in features.py; real indicator values (see
+    # indicators.py) replace the approximations when given
+    return predict_row(features.compute_one(close, volume, high, low, rsi, ma_trend, price_change, volume_change))
+
+
+def predict_features(rows):
+    # predict() over a (4, n) features.compute() array; rows where no rule
+    # fires are "Error"
+    price_diff, volume_diff, trend, rsi_value = rows
+    if lut is None:
+        labels, _ = predict_batch(price_diff, volume_diff, rsi_value, trend)
+        return labels
+
+    # As in predict(), the exact engine answers the cells the LUT declines
+    labels, outputs = lut_predict_batch(price_diff, volume_diff, rsi_value, trend)
+    exact = np.isnan(outputs)
+    if exact.any():
+        labels[exact], _ = predict_batch(price_diff[exact], volume_diff[exact], rsi_value[exact], trend[exact])
+    return labels
+
+
+def predict_many(close, volume, high, low, rsi=None, ma_trend=None, price_change=None, volume_change=None):
+    return predict_features(features.compute(close, volume, high, low, rsi, ma_trend, price_change, volume_change))
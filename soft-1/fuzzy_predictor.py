@@ -1,90 +1,97 @@
-import pandas as pd
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
-import numpy as np
-
-# Load input data
-data = pd.read_csv("stock_inputs.csv")
-
-# Setup fuzzy variables
-price_change = ctrl.Antecedent(np.arange(-10, 11, 1), 'price_change')
-volume_change = ctrl.Antecedent(np.arange(-100, 101, 10), 'volume_change')
-rsi = ctrl.Antecedent(np.arange(0, 101, 1), 'rsi')
-ma_trend = ctrl.Antecedent(np.arange(-5, 6, 1), 'ma_trend')
-action = ctrl.Consequent(np.arange(-1, 2, 1), 'action')
-
-# Membership functions
-price_change['negative'] = fuzz.trapmf(price_change.universe, [-10, -10, -5, 0])
-price_change['stable'] = fuzz.trimf(price_change.universe, [-2, 0, 2])
-price_change['positive'] = fuzz.trapmf(price_change.universe, [0, 5, 10, 10])
-
-volume_change['low'] = fuzz.trapmf(volume_change.universe, [-100, -100, -40, 0])
-volume_change['medium'] = fuzz.trimf(volume_change.universe, [-20, 0, 20])
-volume_change['high'] = fuzz.trapmf(volume_change.universe, [0, 40, 100, 100])
-
-rsi['oversold'] = fuzz.trapmf(rsi.universe, [0, 0, 30, 40])
-rsi['neutral'] = fuzz.trimf(rsi.universe, [35, 50, 65])
-rsi['overbought'] = fuzz.trapmf(rsi.universe, [60, 70, 100, 100])
-
-ma_trend['falling'] = fuzz.trapmf(ma_trend.universe, [-5, -5, -2, 0])
-ma_trend['flat'] = fuzz.trimf(ma_trend.universe, [-1, 0, 1])
-ma_trend['rising'] = fuzz.trapmf(ma_trend.universe, [0, 2, 5, 5])
-
-action['sell'] = fuzz.trimf(action.universe, [-1, -1, 0])
-action['hold'] = fuzz.trimf(action.universe, [-0.5, 0, 0.5])
-action['buy'] = fuzz.trimf(action.universe, [0, 1, 1])
-
-# Fuzzy rules
-rules = [
-    ctrl.Rule(price_change['positive'] & rsi['overbought'], action['sell']),
-    ctrl.Rule(price_change['negative'] & rsi['oversold'], action['buy']),
-    ctrl.Rule(price_change['stable'] & rsi['neutral'], action['hold']),
-    ctrl.Rule(price_change['positive'] & volume_change['high'], action['sell']),
-    ctrl.Rule(price_change['negative'] & volume_change['high'], action['buy']),
-    ctrl.Rule(ma_trend['rising'] & rsi['neutral'], action['buy']),
-    ctrl.Rule(ma_trend['falling'] & rsi['neutral'], action['sell']),
-    ctrl.Rule(ma_trend['rising'] & price_change['positive'], action['buy']),
-    ctrl.Rule(ma_trend['falling'] & price_change['negative'], action['sell']),
-    ctrl.Rule(volume_change['low'] & rsi['overbought'], action['sell']),
-    ctrl.Rule(volume_change['low'] & rsi['oversold'], action['buy']),
-    ctrl.Rule(price_change['stable'] & ma_trend['flat'], action['hold']),
-    ctrl.Rule(price_change['positive'] & rsi['neutral'] & volume_change['medium'], action['hold']),
-    ctrl.Rule(price_change['negative'] & rsi['neutral'] & volume_change['medium'], action['hold']),
-    ctrl.Rule(ma_trend['rising'] & rsi['oversold'], action['buy']),
-    ctrl.Rule(ma_trend['falling'] & rsi['overbought'], action['sell']),
-]
-
-# Create fuzzy system
-stock_ctrl = ctrl.ControlSystem(rules)
-
-# Run for multiple rows
-recommendations = []
-
-for index, row in data.iterrows():
-    if row.isnull().any():
-        print(f"⚠️ Skipping row {index} due to missing values.")
-        recommendations.append("Error")
-        continue
-
-    stock_sim = ctrl.ControlSystemSimulation(stock_ctrl)  # Reset for each row
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import columnar
+import fuzzy_logic
+
+# The shared rule base (rule_base.json), precompiled; workers inherit or
+# reload it in milliseconds
+engine = fuzzy_logic.engine
+
+feature_columns = ['Price Change %', 'Volume Change %', 'RSI', 'MA Trend']
+
+
+def score_chunk(features):
+    # Runs in a worker: features is an (n, 4) array in feature_columns order
+    labels, _ = fuzzy_logic.predict_batch(*features.T, engine=engine)
+    return labels
+
+
+def score_file(input_path, output_path, chunk_size=100_000, workers=None):
+    workers = os.cpu_count() if workers is None else workers
+    pool = ProcessPoolExecutor(workers) if workers > 0 else None
+    # Either path may be a CSV or a column bundle (see columnar.py)
+    bundle = columnar.BundleWriter(output_path) if columnar.is_bundle(output_path) else None
+    pending = deque()
+    written = 0
+    skipped = 0
+
+    def write(chunk, labels):
+        nonlocal written
+        chunk = chunk.assign(Recommendation=labels)
+        if bundle is not None:
+            bundle.append(chunk)
+        else:
+            chunk.to_csv(output_path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        if written == 0:
+            print("\n✅ Prediction started. Sample Output:")
+            print(chunk[['Price Change %', 'Volume Change %', 'RSI', 'MA Trend', 'Recommendation']].head())
+        written += len(chunk)
+
+    def finish(chunk, missing, result):
+        labels = result.result() if pool is not None else result
+        labels[missing] = "Error"
+        write(chunk, labels)
 
     try:
-        stock_sim.input['price_change'] = row['Price Change %']
-        stock_sim.input['volume_change'] = row['Volume Change %']
-        stock_sim.input['rsi'] = row['RSI']
-        stock_sim.input['ma_trend'] = row['MA Trend']
-        stock_sim.compute()
-
-        output = stock_sim.output['action']
-        rec = "Buy" if output > 0.3 else "Sell" if output < -0.3 else "Hold"
-        recommendations.append(rec)
-
-    except Exception as e:
-        print(f"❌ Error in row {index}: {e}")
-        recommendations.append("Error")
-
-# Save output
-data['Recommendation'] = recommendations
-data.to_csv("fuzzy_output.csv", index=False)
-print("\n✅ Prediction Completed. Sample Output:")
-print(data[['Price Change %', 'Volume Change %', 'RSI', 'MA Trend', 'Recommendation']].head())
+        # Stream the input; at most 2 chunks per worker are in flight, so
+        # memory is bounded by chunk size rather than file size
+        for chunk in columnar.iter_chunks(input_path, chunk_size):
+            missing = chunk.isnull().any(axis=1).to_numpy()
+            if missing.any():
+                print(f"⚠️ Skipping {int(missing.sum())} rows due to missing values "
+                      f"(first: row {chunk.index[missing][0]}).")
+                skipped += int(missing.sum())
+
+            features = chunk[feature_columns].to_numpy(dtype=float)
+            if pool is None:
+                finish(chunk, missing, score_chunk(features))
+                continue
+
+            pending.append((chunk, missing, pool.submit(score_chunk, features)))
+            while len(pending) >= 2 * workers:
+                finish(*pending.popleft())
+
+        # Results are written in submission order, so output order matches input
+        while pending:
+            finish(*pending.popleft())
+        if bundle is not None:
+            bundle.close()
+    except BaseException:
+        if bundle is not None:
+            bundle.abort()
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return written, skipped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score indicator rows with the fuzzy rule base")
+    parser.add_argument("input", nargs="?", default=columnar.resolve("stock_inputs.csv"),
+                        help="CSV or .cols bundle (default: stock_inputs, bundle preferred)")
+    parser.add_argument("output", nargs="?", default="fuzzy_output.csv", help="CSV, or a .cols path for a bundle")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows read and scored per chunk")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: CPU count, 0 scores in this process)")
+    args = parser.parse_args()
+
+    rows, skipped = score_file(args.input, args.output, args.chunk_size, args.workers)
+    if rows == 0:
+        sys.exit(f"❌ No rows found in {args.input}")
+    print(f"\n✅ Prediction Completed: {rows} rows ({skipped} with missing values) -> {args.output}")
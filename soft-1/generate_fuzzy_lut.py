@@ -0,0 +1,44 @@
+import argparse
+import time
+import numpy as np
+
+import fuzzy_logic
+
+# Sample the fuzzy decision surface onto a 4-D grid and save it for LUT mode
+parser = argparse.ArgumentParser(description="Build the fuzzy decision-surface lookup table")
+parser.add_argument("--shape", type=int, nargs=4, default=[21, 21, 21, 11],
+                    metavar=("PRICE", "VOLUME", "RSI", "MA"),
+                    help="Grid points per input (price, volume, RSI, MA trend)")
+parser.add_argument("--dtype", default="float32", choices=["float16", "float32", "float64"])
+parser.add_argument("--out", default=fuzzy_logic.lut_path)
+parser.add_argument("--samples", type=int, default=200_000,
+                    help="Random inputs used to measure the interpolation error")
+args = parser.parse_args()
+
+start = time.perf_counter()
+table = fuzzy_logic.build_lut(tuple(args.shape), dtype=args.dtype)
+fuzzy_logic.save_lut(table, args.out)
+print(f"LUT {table.shape} {table.dtype} built in {time.perf_counter() - start:.2f}s "
+      f"({table.nbytes / 1024:.0f} KiB) -> {args.out}")
+
+# Error against the exact engine over the whole clipped input space
+rng = np.random.default_rng(0)
+low, high = np.array(fuzzy_logic.engine['bounds'], dtype=float).T
+samples = rng.uniform(low, high, size=(args.samples, 4)).T
+
+exact_labels, exact = fuzzy_logic.predict_batch(*samples)
+start = time.perf_counter()
+table = np.load(args.out, mmap_mode='r')
+_, approx = fuzzy_logic.lut_predict_batch(*samples, table=table, strict=False)
+lookup_time = time.perf_counter() - start
+lut_labels, strict = fuzzy_logic.lut_predict_batch(*samples, table=table)
+
+both = ~np.isnan(exact) & ~np.isnan(approx)
+error = np.abs(approx[both] - exact[both])
+print(f"Max error: {error.max():.4f}, mean error: {error.mean():.5f}")
+
+# In predict() LUT mode, strict NaNs are answered by the exact engine
+answered = ~np.isnan(exact) & ~np.isnan(strict)
+print(f"Answered from the LUT: {answered.mean() * 100:.2f}%, "
+      f"label agreement there: {(lut_labels[answered] == exact_labels[answered]).mean() * 100:.3f}%")
+print(f"Lookup: {lookup_time / args.samples * 1e6:.2f} µs/sample in batch")
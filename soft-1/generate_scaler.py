@@ -1,19 +1,24 @@
-import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
+import argparse
+
 from joblib import dump
 
-# Load the input CSV
-df = pd.read_csv("stock_inputs.csv")
+import columnar
+from anfis_train import fit_scaler, make_scaler
 
-# Corrected column names
-input_columns = ['Price Change %', 'Volume Change %', 'MA Trend', 'RSI']
-X = df[input_columns]
+# Refit scaler.pkl the way anfis_train.py does: a StandardScaler over the
+# training rows only (same validation split), so the ANFIS model always
+# sees inputs scaled as in training. check_scaler.py verifies the result.
+parser = argparse.ArgumentParser(description="Fit the ANFIS input scaler")
+parser.add_argument("inputs", nargs="*", default=[columnar.resolve("stock_inputs.csv")],
+                    help="CSV files or .cols bundles with the feature columns (default: stock_inputs)")
+parser.add_argument("--validation", type=float, default=0.2, help="Fraction of rows held out, as in training")
+parser.add_argument("--chunk-size", type=int, default=200_000)
+parser.add_argument("--output", default="scaler.pkl")
+args = parser.parse_args()
 
-# Scale the input features
-scaler = MinMaxScaler()
-scaler.fit(X)
+samples, _, mean, scale = fit_scaler(args.inputs, args.chunk_size, args.validation)
 
 # Save the scaler to a file
-dump(scaler, "scaler.pkl")
+dump(make_scaler(samples, mean, scale), args.output)
 
-print("Scaler has been created and saved as scaler.pkl")
+print(f"Scaler has been created and saved as {args.output}")
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+# Technical indicators shared by the pipeline scripts, the GUI and the web
+# app: price/volume change %, MA trend (5-bar MA minus 10-bar MA) and
+# Wilder's RSI. compute() works on whole histories; update() advances one
+# symbol by one bar in O(1) using a small state array.
+
+short_window = 5
+long_window = 10
+rsi_period = 14
+
+feature_columns = ['Price Change %', 'Volume Change %', 'MA Trend', 'RSI']
+
+# Layout of the state array used by update(): scalars, then a ring buffer of
+# the last long_window closes
+PREV_CLOSE, PREV_VOLUME, BARS, AVG_GAIN, AVG_LOSS, SUM_SHORT, SUM_LONG, RING = range(8)
+state_size = RING + long_window
+
+
+def new_state():
+    state = np.zeros(state_size)
+    state[PREV_CLOSE] = state[PREV_VOLUME] = np.nan
+    return state
+
+
+def _rsi_value(avg_gain, avg_loss):
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else 50.0
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def update(state, close, volume):
+    # Advance the state by one bar; returns the feature values for that bar
+    # (NaN until enough bars have been seen)
+    close, volume = float(close), float(volume)
+    bars = int(state[BARS])
+    prev_close, prev_volume = state[PREV_CLOSE], state[PREV_VOLUME]
+
+    price_change = (close - prev_close) / prev_close * 100 if bars else np.nan
+    volume_change = (volume - prev_volume) / prev_volume * 100 if bars else np.nan
+
+    # Moving averages from running sums over the ring buffer
+    slot = RING + bars % long_window
+    if bars >= long_window:
+        state[SUM_LONG] -= state[slot]
+    if bars >= short_window:
+        state[SUM_SHORT] -= state[RING + (bars - short_window) % long_window]
+    state[slot] = close
+    state[SUM_LONG] += close
+    state[SUM_SHORT] += close
+    if slot == state_size - 1:
+        # Re-sum once per lap so float error can't build up over long streams
+        state[SUM_LONG] = state[RING:].sum()
+        state[SUM_SHORT] = sum(state[RING + (bars - i) % long_window] for i in range(min(bars + 1, short_window)))
+    ma_trend = state[SUM_SHORT] / short_window - state[SUM_LONG] / long_window if bars + 1 >= long_window else np.nan
+
+    # Wilder's RSI: seeded with the plain average of the first rsi_period
+    # moves, then smoothed with alpha = 1 / rsi_period
+    rsi = np.nan
+    if bars:
+        delta = close - prev_close
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        if bars <= rsi_period:
+            state[AVG_GAIN] += gain / rsi_period
+            state[AVG_LOSS] += loss / rsi_period
+        else:
+            state[AVG_GAIN] += (gain - state[AVG_GAIN]) / rsi_period
+            state[AVG_LOSS] += (loss - state[AVG_LOSS]) / rsi_period
+        if bars >= rsi_period:
+            rsi = _rsi_value(state[AVG_GAIN], state[AVG_LOSS])
+
+    state[PREV_CLOSE], state[PREV_VOLUME], state[BARS] = close, volume, bars + 1
+    return price_change, volume_change, ma_trend, rsi
+
+
+def moving_average(values, window):
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.concatenate([[0.0], values]))
+        out[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return out
+
+
+def rsi(close, period=rsi_period):
+    close = np.asarray(close, dtype=float)
+    out = np.full(len(close), np.nan)
+    if len(close) <= period:
+        return out
+
+    delta = np.diff(close)
+    gains, losses = np.clip(delta, 0, None), np.clip(-delta, 0, None)
+
+    # Wilder smoothing is an EWM with adjust=False, started from the seed
+    def smooth(moves):
+        series = np.concatenate([[moves[:period].mean()], moves[period:]])
+        return pd.Series(series).ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+
+    avg_gain, avg_loss = smooth(gains), smooth(losses)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100 - 100 / (1 + avg_gain / avg_loss)
+    values[avg_loss == 0] = np.where(avg_gain[avg_loss == 0] > 0, 100.0, 50.0)
+    out[period:] = values
+    return out
+
+
+def compute(close, volume):
+    # Vectorized features over a whole history, keyed by feature_columns
+    close = np.asarray(close, dtype=float).ravel()
+    volume = np.asarray(volume, dtype=float).ravel()
+
+    def pct_change(values):
+        out = np.full(len(values), np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[1:] = (values[1:] - values[:-1]) / values[:-1] * 100
+        return out
+
+    return {
+        'Price Change %': pct_change(close),
+        'Volume Change %': pct_change(volume),
+        'MA Trend': moving_average(close, short_window) - moving_average(close, long_window),
+        'RSI': rsi(close),
+    }
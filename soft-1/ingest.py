@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+
+required_cols = ["Date", "Open", "High", "Low", "Close", "Volume"]
+price_cols = ["Open", "High", "Low", "Close"]
+volume_units = {"K": 1_000, "M": 1_000_000, "B": 1_000_000_000}
+
+
+class InvalidUpload(ValueError):
+    pass
+
+
+def parse_volume(value):
+    value = str(value).strip().upper().replace(',', '')
+    try:
+        if value.endswith("M"):
+            return float(value[:-1]) * 1_000_000
+        elif value.endswith("B"):
+            return float(value[:-1]) * 1_000_000_000
+        elif value.endswith("K"):
+            return float(value[:-1]) * 1_000
+        else:
+            return float(value)
+    except:
+        raise ValueError(f"Invalid volume format: {value}")
+
+
+def _as_bytes(values):
+    # Fixed-width byte strings let NumPy work on whole columns in C;
+    # None if the column has non-ASCII text
+    try:
+        return np.asarray(pd.Series(values, copy=False).astype(str).to_numpy(), dtype=bytes)
+    except UnicodeEncodeError:
+        return None
+
+
+def parse_volume_column(values):
+    # Vectorized parse_volume over a whole column; invalid entries become NaN
+    text = _as_bytes(values)
+    if text is None or text.dtype.itemsize == 0:
+        return pd.Series(values, copy=False).map(_parse_volume_or_nan).to_numpy(dtype="float64")
+
+    text = np.char.upper(np.char.strip(np.char.replace(text, b',', b'')))
+    width = text.dtype.itemsize
+    chars = text.view(np.uint8).reshape(len(text), width).copy()
+    last = np.maximum(np.char.str_len(text) - 1, 0)
+    rows = np.arange(len(text))
+
+    # Read the K/M/B suffix, then blank it out so only the number remains
+    multiplier = np.ones(256)
+    for unit, factor in volume_units.items():
+        multiplier[ord(unit)] = factor
+    unit = chars[rows, last]
+    scale = multiplier[unit]
+    chars[rows[scale != 1], last[scale != 1]] = ord(' ')
+    numbers = chars.view(f"S{width}").ravel()
+
+    try:
+        return numbers.astype("float64") * scale
+    except ValueError:
+        return pd.to_numeric(pd.Series(numbers.astype(str)), errors='coerce').to_numpy(dtype="float64") * scale
+
+
+def _parse_volume_or_nan(value):
+    try:
+        return parse_volume(value)
+    except ValueError:
+        return np.nan
+
+
+def parse_price_column(values):
+    # Prices read as text, with thousands separators; invalid entries become NaN
+    values = pd.Series(values, copy=False)
+    try:
+        return values.astype("float64").to_numpy()
+    except ValueError:
+        text = values.astype(str).str.replace(',', '', regex=False)
+        return pd.to_numeric(text, errors='coerce').to_numpy(dtype="float64")
+
+
+def parse_dates(values):
+    # DD-MM-YYYY to datetime64[s]. Well-formed 10-character dates are decoded
+    # with integer math on the raw bytes; anything else goes through
+    # pd.to_datetime. Invalid dates become NaT.
+    values = pd.Series(values, copy=False)
+    dates = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[s]")
+    text = _as_bytes(values)
+
+    fast = np.zeros(len(values), dtype=bool)
+    if text is not None and text.dtype.itemsize >= 10:
+        chars = text.view(np.uint8).reshape(len(text), text.dtype.itemsize)
+        digits = chars[:, [0, 1, 3, 4, 6, 7, 8, 9]].astype(np.int64) - ord('0')
+        fast = ((np.char.str_len(text) == 10) & (chars[:, 2] == ord('-')) & (chars[:, 5] == ord('-'))
+                & ((digits >= 0) & (digits <= 9)).all(axis=1))
+
+        day = digits[:, 0] * 10 + digits[:, 1]
+        month = digits[:, 2] * 10 + digits[:, 3]
+        year = digits[:, 4] * 1000 + digits[:, 5] * 100 + digits[:, 6] * 10 + digits[:, 7]
+        start = ((year - 1970) * 12 + np.clip(month, 1, 12) - 1).astype("datetime64[M]")
+        month_days = ((start + 1).astype("datetime64[D]") - start.astype("datetime64[D]")).astype(np.int64)
+        valid = fast & (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_days)
+
+        dates[valid] = start[valid].astype("datetime64[D]") + (day[valid] - 1)
+
+    if not fast.all():
+        dates[~fast] = pd.to_datetime(values[~fast], format='%d-%m-%Y', errors='coerce').to_numpy(dtype="datetime64[s]")
+    return dates
+
+
+def read_upload(file, chunk_size=200_000):
+    # Stream an uploaded OHLCV CSV in chunks, keeping only the needed columns
+    # as compact arrays. Returns the date-sorted columns and the latest row,
+    # which is found per chunk without sorting the frame. Prices that don't
+    # parse become NaN; only a bad latest row rejects the upload.
+    header = pd.read_csv(file, nrows=0).columns
+    if not set(required_cols).issubset(header):
+        raise InvalidUpload("Invalid CSV format!")
+    file.seek(0)
+
+    parts = {name: [] for name in required_cols}
+    latest, latest_date = None, None
+    chunks = pd.read_csv(file, usecols=required_cols, chunksize=chunk_size, dtype=str)
+
+    for chunk in chunks:
+        dates = parse_dates(chunk["Date"])
+        valid = ~np.isnat(dates)
+        if not valid.any():
+            continue
+        chunk = chunk[valid]
+        dates = dates[valid]
+        prices = {name: parse_price_column(chunk[name]) for name in price_cols}
+
+        # Later rows win ties, as with a stable sort
+        newest = dates.max()
+        if latest_date is None or newest >= latest_date:
+            latest_date = newest
+            i = np.flatnonzero(dates == newest)[-1]
+            latest = {**{name: values[i] for name, values in prices.items()}, "Volume": chunk["Volume"].iloc[i]}
+
+        parts["Date"].append(dates)
+        for name in price_cols:
+            parts[name].append(prices[name].astype("float32"))
+        parts["Volume"].append(parse_volume_column(chunk["Volume"]).astype("float32"))
+
+    if latest is None:
+        raise InvalidUpload("No rows with a valid Date (expected DD-MM-YYYY)")
+    if np.isnan([latest["Close"], latest["High"], latest["Low"]]).any():
+        raise InvalidUpload(f"Invalid price on {latest_date.astype('datetime64[D]')}")
+
+    columns = {name: np.concatenate(arrays) for name, arrays in parts.items()}
+    order = np.argsort(columns["Date"], kind="stable")
+    columns = {name: values[order] for name, values in columns.items()}
+
+    row = {
+        "close": float(latest["Close"]),
+        "volume": parse_volume(latest["Volume"]),
+        "high": float(latest["High"]),
+        "low": float(latest["Low"]),
+    }
+    return columns, row
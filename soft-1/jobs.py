@@ -0,0 +1,185 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class QueueFull(Exception):
+    # Raised by JobQueue.submit when max_pending jobs are already waiting
+    pass
+
+
+class Job:
+    def __init__(self, job_id, cleanup=None):
+        self.id = job_id
+        self.status = "queued"  # -> running -> done | failed
+        self.created = time.time()
+        self.started = self.finished = None
+        self.result = self.error = None
+        self.cleanup = cleanup
+
+    def to_dict(self):
+        return {"job_id": self.id, "status": self.status, "created": self.created,
+                "started": self.started, "finished": self.finished, "error": self.error}
+
+    @classmethod
+    def from_dict(cls, data):
+        # A job as saved by another process; it can be read, not run
+        job = cls(data["job_id"])
+        job.status, job.created, job.started = data["status"], data["created"], data["started"]
+        job.finished, job.error, job.result = data["finished"], data["error"], data["result"]
+        return job
+
+
+class JobQueue:
+    # Background jobs run by `workers` threads. At most max_pending jobs may
+    # wait; beyond that submit() raises QueueFull so callers can push back
+    # instead of piling up work. Finished jobs are kept ttl seconds for
+    # polling, then forgotten. With state_dir set, each job's status and
+    # (JSON-serializable) result are also written there as they change, and
+    # get() reads jobs it doesn't hold from it, so every process sharing the
+    # directory can answer a poll. Jobs still run, and max_pending still
+    # applies, in the process that queued them.
+    def __init__(self, workers=2, max_pending=16, ttl=3600, state_dir=None, sweep_interval=60):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.state_dir = state_dir
+        self.sweep_interval = sweep_interval
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = None
+        self._last_sweep = 0
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+
+    def submit(self, fn, *args, cleanup=None):
+        # Queue fn(*args); cleanup() runs once the job has finished or, if
+        # the queue is full, right away
+        self._ensure_workers()
+        job = Job(uuid.uuid4().hex, cleanup)
+        with self._lock:
+            self._expire()
+            self._jobs[job.id] = job
+        self._save(job)  # Before a worker can pick it up and save it as running
+        try:
+            self._queue.put_nowait((job, fn, args))
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+                self.rejected += 1
+            self._remove(job.id)
+            if cleanup is not None:
+                cleanup()
+            raise QueueFull(f"{self.max_pending} jobs already waiting") from None
+        self._sweep()
+        return job.id
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+        return job if job is not None else self._load(job_id)
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [k for k, j in self._jobs.items() if j.finished is not None and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def _path(self, job_id):
+        # IDs come from URLs, so only ever use the hex part
+        return os.path.join(self.state_dir, f"{job_id}.json") if self.state_dir and job_id.isalnum() else None
+
+    def _save(self, job):
+        path = self._path(job.id)
+        if path:
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({**job.to_dict(), "result": job.result}, f)
+            os.replace(tmp, path)
+
+    def _load(self, job_id):
+        path = self._path(job_id)
+        try:
+            with open(path) as f:
+                job = Job.from_dict(json.load(f))
+        except (TypeError, OSError, ValueError, KeyError):  # No state_dir, unknown, swept or unreadable
+            return None
+        if job.finished is not None and job.finished < time.time() - self.ttl:
+            return None
+        return job
+
+    def _remove(self, job_id):
+        try:
+            os.remove(self._path(job_id))
+        except (TypeError, OSError):
+            pass
+
+    def _sweep(self):
+        # Delete the state of jobs untouched for ttl seconds
+        now = time.time()
+        with self._lock:
+            if not self.state_dir or now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        for name in os.listdir(self.state_dir):
+            path = os.path.join(self.state_dir, name)
+            try:
+                if os.path.getmtime(path) < now - self.ttl:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _run(self):
+        while True:
+            job, fn, args = self._queue.get()
+            with self._lock:
+                job.status, job.started = "running", time.time()
+                self.running += 1
+            self._save(job)
+            try:
+                result, error = fn(*args), None
+            except Exception as e:
+                result, error = None, str(e)
+            finally:
+                if job.cleanup is not None:
+                    job.cleanup()
+            with self._lock:
+                job.result, job.error = result, error
+                job.status = "done" if error is None else "failed"
+                job.finished = time.time()
+                self.running -= 1
+                if error is None:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            try:
+                self._save(job)
+            except (OSError, TypeError, ValueError) as e:  # e.g. a result that isn't JSON
+                print(f"⚠️ Could not save job {job.id}: {e}")
+
+    def _ensure_workers(self):
+        # Started lazily, and again in a forked child, where threads don't
+        # survive and the inherited queue may hold the parent's jobs
+        with self._lock:
+            if self._threads is None or self._threads[0] != os.getpid():
+                if self._threads is not None:
+                    self._queue = queue.Queue(maxsize=self.max_pending)
+                    self.running = 0
+                threads = [threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                           for i in range(self.workers)]
+                for thread in threads:
+                    thread.start()
+                self._threads = (os.getpid(), threads)
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Daily OHLCV history behind a per-symbol on-disk cache. Only date ranges not
+# already cached are fetched from the provider, and many symbols load in
+# parallel. Set MARKET_DATA_DIR to read <SYMBOL>.csv files from a local
+# directory instead of Yahoo Finance (offline runs and tests). Each provider
+# caches under its own cache_key, so local or test data never answers a
+# later Yahoo load, or the other way round.
+
+ohlcv_columns = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class YahooProvider:
+    cache_key = "yahoo"
+
+    def fetch(self, symbol, start, end):
+        import yfinance as yf
+
+        data = yf.download(symbol, start=str(start), end=str(end), interval='1d', progress=False)
+        if isinstance(data.columns, pd.MultiIndex):
+            data.columns = data.columns.get_level_values(0)
+        return data
+
+
+class LocalFileProvider:
+    # Reads <directory>/<SYMBOL>.csv with a Date column and OHLCV columns
+    def __init__(self, directory):
+        self.directory = directory
+        path = os.path.abspath(directory)
+        self.cache_key = f"local-{hashlib.sha1(path.encode()).hexdigest()[:12]}"
+
+    def fetch(self, symbol, start, end):
+        data = pd.read_csv(os.path.join(self.directory, f"{symbol}.csv"), parse_dates=["Date"], index_col="Date")
+        return data[(data.index >= pd.Timestamp(start)) & (data.index < pd.Timestamp(end))]
+
+
+def default_provider():
+    if os.environ.get("MARKET_DATA_DIR"):
+        return LocalFileProvider(os.environ["MARKET_DATA_DIR"])
+    return YahooProvider()
+
+
+def _day(value):
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _missing_ranges(covered, start, end):
+    missing, cursor = [], start
+    for lo, hi in covered:
+        if hi <= cursor or lo >= end:
+            continue
+        if lo > cursor:
+            missing.append((cursor, lo))
+        cursor = max(cursor, hi)
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+class MarketData:
+    def __init__(self, provider=None, cache_dir="market_cache"):
+        self.provider = provider or default_provider()
+        key = getattr(self.provider, "cache_key", type(self.provider).__name__)
+        self.cache_dir = cache_dir and os.path.join(cache_dir, key)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _lock(self, symbol):
+        with self._locks_lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _path(self, symbol):
+        return os.path.join(self.cache_dir, f"{symbol.replace('/', '_')}.npz")
+
+    def _read_cache(self, symbol):
+        path = self.cache_dir and self._path(symbol)
+        if not path or not os.path.exists(path):
+            columns = {name: np.empty(0) for name in ohlcv_columns}
+            return {"Date": np.empty(0, dtype="datetime64[D]"), **columns}, []
+        with np.load(path) as data:
+            columns = {name: data[name] for name in ["Date"] + ohlcv_columns}
+            covered = [[lo, hi] for lo, hi in data["covered"]]
+        return columns, covered
+
+    def _write_cache(self, symbol, columns, covered):
+        # Write then rename, so readers never see a partial file
+        path = self._path(symbol)
+        tmp = f"{path}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp, covered=np.array(covered, dtype="datetime64[D]").reshape(-1, 2), **columns)
+        os.replace(tmp, path)
+
+    def load(self, symbol, start, end):
+        # OHLCV rows with start <= Date < end, as a Date-indexed DataFrame
+        start, end = _day(start), _day(end)
+        with self._lock(symbol):
+            columns, covered = self._read_cache(symbol)
+            missing = _missing_ranges(covered, start, end)
+
+            if missing:
+                fetched = [columns]
+                for lo, hi in missing:
+                    frame = self.provider.fetch(symbol, lo, hi)
+                    fetched.append({
+                        "Date": frame.index.to_numpy(dtype="datetime64[D]"),
+                        **{name: frame[name].to_numpy(dtype="float64").ravel() for name in ohlcv_columns},
+                    })
+
+                # Newly fetched rows replace cached ones for the same date
+                merged = {name: np.concatenate([part[name] for part in fetched]) for name in columns}
+                dates = merged["Date"].astype("datetime64[D]")
+                order = np.argsort(dates, kind="stable")[::-1]
+                _, keep = np.unique(dates[order], return_index=True)
+                keep = order[keep]
+                columns = {name: values[keep] for name, values in merged.items()}
+                columns["Date"] = columns["Date"].astype("datetime64[D]")
+
+                # Today's bar may still change, so never mark it as cached
+                today = np.datetime64(pd.Timestamp.now().date(), 'D')
+                covered = _merge_ranges(covered + [[lo, min(hi, today)] for lo, hi in missing if lo < min(hi, today)])
+                if self.cache_dir:
+                    self._write_cache(symbol, columns, covered)
+
+        dates = columns["Date"].astype("datetime64[D]")
+        rows = (dates >= start) & (dates < end)
+        frame = pd.DataFrame({name: columns[name][rows] for name in ohlcv_columns},
+                             index=pd.DatetimeIndex(dates[rows], name="Date"))
+        return frame
+
+    def load_many(self, symbols, start, end, workers=8):
+        # Symbols load on a thread pool; failures are reported and skipped
+        results = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {symbol: pool.submit(self.load, symbol, start, end) for symbol in symbols}
+            for symbol, future in futures.items():
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    print(f"⚠️ Could not load {symbol}: {e}")
+        return results
+
+
+_default = None
+
+
+def _market_data():
+    global _default
+    if _default is None:
+        _default = MarketData()
+    return _default
+
+
+def load(symbol, start, end):
+    return _market_data().load(symbol, start, end)
+
+
+def load_many(symbols, start, end, workers=8):
+    return _market_data().load_many(symbols, start, end, workers)
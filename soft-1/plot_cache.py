@@ -0,0 +1,47 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def content_key(data, options):
+    # Hash of the plotted data and the options it is drawn with
+    digest = hashlib.sha256(data)
+    digest.update(json.dumps(options, sort_keys=True).encode())
+    return digest.hexdigest()[:32]
+
+
+class PlotCache:
+    # LRU of rendered images, bounded by entry count and total bytes
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_items=256):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._items.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key, image):
+        with self._lock:
+            if key in self._items:
+                self.size -= len(self._items.pop(key))
+            if len(image) > self.max_bytes:
+                return
+            self._items[key] = image
+            self.size += len(image)
+            while self.size > self.max_bytes or len(self._items) > self.max_items:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
@@ -0,0 +1,218 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from ingest import InvalidUpload, parse_dates, parse_price_column, parse_volume_column, price_cols, read_upload, required_cols
+
+# Bulk scoring of many symbols per request. An upload is a zip of per-symbol
+# CSVs, several CSV files, or one long-format CSV with a Symbol (or Ticker)
+# column; per-symbol files are named after their symbol (AAPL.csv). Each
+# file or zip member is a separate task that can run on its own thread, and
+# a symbol that fails to parse becomes an error row instead of failing the
+# whole upload. Zip members are checked against size limits before they are
+# decompressed, then streamed to a spooled temp file, never fully into RAM.
+
+symbol_columns = ("Symbol", "Ticker")
+result_fields = ["symbol", "date", "rows", "close", "volume", "rsi", "ma_trend", "fuzzy", "anfis", "error"]
+spool_bytes = 1024 * 1024  # Decompressed members above this go to disk
+
+
+def symbol_from_name(name):
+    return os.path.splitext(os.path.basename(name))[0].strip().upper()
+
+
+def summarize(symbol, columns, latest):
+    # The latest bar of one symbol's date-sorted columns, with its
+    # indicators from the whole history (NaN when the history is too short)
+    history = indicators.compute(columns["Close"], columns["Volume"])
+    return {"symbol": symbol, "columns": columns, "rows": len(columns["Close"]),
+            "date": str(columns["Date"][-1].astype("datetime64[D]")), **latest,
+            "rsi": float(history["RSI"][-1]), "ma_trend": float(history["MA Trend"][-1]),
+            "price_change": float(history["Price Change %"][-1]), "volume_change": float(history["Volume Change %"][-1])}
+
+
+def load_file(symbol, file):
+    columns, latest = read_upload(file)
+    return [summarize(symbol, columns, latest)]
+
+
+def load_member(archive, info):
+    # Stops at the size the member's header declares (the size the limits
+    # were checked against), so a lying header can't expand further
+    with archive.open(info) as source, tempfile.SpooledTemporaryFile(max_size=spool_bytes) as copy:
+        copied = 0
+        for chunk in iter(lambda: source.read(1024 * 1024), b""):
+            copied += len(chunk)
+            if copied > info.file_size:
+                raise InvalidUpload(f"{info.filename} is larger than its zip header says")
+            copy.write(chunk)
+        copy.seek(0)
+        return load_file(symbol_from_name(info.filename), copy)
+
+
+def load_long(file, symbol_column):
+    # One CSV holding many symbols: parsed in one pass, then split per
+    # symbol into the same columns read_upload returns. A symbol whose
+    # latest row has a bad price or volume is an error row; the rest still score.
+    frame = pd.read_csv(file, usecols=required_cols + [symbol_column], dtype=str)
+    dates = parse_dates(frame["Date"])
+    valid = ~np.isnat(dates) & frame[symbol_column].notna().to_numpy()
+    if not valid.any():
+        raise InvalidUpload("No rows with a valid Date (expected DD-MM-YYYY) and Symbol")
+    frame, dates = frame[valid], dates[valid]
+
+    symbols = frame[symbol_column].str.strip().str.upper().to_numpy(dtype=str)
+    order = np.lexsort((dates, symbols))  # By symbol, then date; stable, so later rows win ties
+    symbols, dates = symbols[order], dates[order]
+    prices = {name: parse_price_column(frame[name])[order] for name in price_cols}
+    volume = parse_volume_column(frame["Volume"])[order]
+
+    entries = []
+    starts = np.flatnonzero(np.r_[True, symbols[1:] != symbols[:-1]])
+    for start, stop in zip(starts, np.r_[starts[1:], len(symbols)]):
+        symbol = str(symbols[start])
+        if np.isnan([prices[name][stop - 1] for name in ("Close", "High", "Low")]).any():
+            entries.append({"symbol": symbol, "error": f"Invalid price on {dates[stop - 1].astype('datetime64[D]')}"})
+            continue
+        if np.isnan(volume[stop - 1]):
+            entries.append({"symbol": symbol, "error": f"Invalid volume on {dates[stop - 1].astype('datetime64[D]')}"})
+            continue
+        columns = {"Date": dates[start:stop], "Volume": volume[start:stop].astype("float32"),
+                   **{name: values[start:stop].astype("float32") for name, values in prices.items()}}
+        latest = {"close": float(prices["Close"][stop - 1]), "volume": float(volume[stop - 1]),
+                  "high": float(prices["High"][stop - 1]), "low": float(prices["Low"][stop - 1])}
+        entries.append(summarize(symbol, columns, latest))
+    return entries
+
+
+def tasks(filename, stream, max_symbols, max_member_bytes):
+    # (name, fn) pairs, fn() returning the entries for one file or zip
+    # member, and the decompressed bytes the zip members declare
+    if filename.lower().endswith(".zip"):
+        archive = zipfile.ZipFile(stream)
+        members = [info for info in archive.infolist()
+                   if not info.is_dir() and info.filename.lower().endswith(".csv")
+                   and not os.path.basename(info.filename).startswith(".") and "__MACOSX/" not in info.filename]
+        if len(members) > max_symbols:
+            raise InvalidUpload(f"{filename} has {len(members)} CSV files, the limit is {max_symbols}")
+
+        work = []
+        for info in members:
+            if info.file_size > max_member_bytes:
+                error = [{"symbol": symbol_from_name(info.filename),
+                          "error": f"{info.file_size:,} bytes uncompressed, the limit is {max_member_bytes:,}"}]
+                work.append((info.filename, lambda error=error: error))
+            else:
+                work.append((symbol_from_name(info.filename), lambda info=info: load_member(archive, info)))
+        return work, sum(info.file_size for info in members if info.file_size <= max_member_bytes)
+
+    header = pd.read_csv(stream, nrows=0).columns
+    stream.seek(0)
+    symbol_column = next((c for c in symbol_columns if c in header), None)
+    if symbol_column is not None:
+        return [(filename, lambda: load_long(stream, symbol_column))], 0
+    return [(symbol_from_name(filename), lambda: load_file(symbol_from_name(filename), stream))], 0
+
+
+def run_task(name, fn):
+    # Any failure is reported against the file or member it came from
+    try:
+        return fn()
+    except Exception as e:
+        return [{"symbol": name, "error": str(e) or type(e).__name__}]
+
+
+def load(files, pool, max_symbols=1000, max_member_bytes=64 * 1024 * 1024, max_total_bytes=512 * 1024 * 1024):
+    # Entries for every symbol in `files`, a list of (filename, stream),
+    # parsed on `pool`. Symbols seen more than once keep their first series.
+    # A zip member over max_member_bytes uncompressed is an error row; zips
+    # adding up to more than max_total_bytes reject the whole upload.
+    work, total = [], 0
+    for filename, stream in files:
+        try:
+            file_work, size = tasks(filename, stream, max_symbols, max_member_bytes)
+            work.extend(file_work)
+            total += size
+        except Exception as e:
+            error = [{"symbol": filename, "error": str(e) or type(e).__name__}]
+            work.append((filename, lambda error=error: error))
+    if total > max_total_bytes:
+        raise InvalidUpload(f"The zips hold {total:,} bytes uncompressed, the limit is {max_total_bytes:,}")
+
+    entries, seen = [], set()
+    for future in [pool.submit(run_task, name, fn) for name, fn in work]:
+        for entry in future.result():
+            if entry["symbol"] in seen:
+                entry = {"symbol": entry["symbol"], "error": "Listed more than once, the first series was scored"}
+            seen.add(entry["symbol"])
+            entries.append(entry)
+    if len(entries) > max_symbols:
+        raise InvalidUpload(f"{len(entries)} symbols uploaded, the limit is {max_symbols}")
+    return entries
+
+
+class ResultStore:
+    # Scored results as JSON files in `directory`, kept ttl seconds, so a
+    # download can be served by any process sharing the directory
+    def __init__(self, directory, ttl=3600, sweep_interval=60):
+        self.directory = directory
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def put(self, results):
+        result_id = uuid.uuid4().hex
+        path = os.path.join(self.directory, f"{result_id}.json")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(results, f)
+        os.replace(tmp, path)
+        self._sweep()
+        return result_id
+
+    def get(self, result_id):
+        # IDs come from URLs, so only ever use the hex part
+        if not result_id.isalnum():
+            return None
+        path = os.path.join(self.directory, f"{result_id}.json")
+        try:
+            if os.path.getmtime(path) < time.time() - self.ttl:
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):  # Unknown, swept or unreadable
+            return None
+
+    def _sweep(self):
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < now - self.ttl:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def to_csv(results):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=result_fields, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(results)
+    return out.getvalue()
@@ -0,0 +1,85 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    # LRU + TTL memo of predictions keyed on the exact feature vector, so a
+    # hit returns what inference on those inputs returns. With `decimals`
+    # set, keys are rounded to that many places instead: any input in the
+    # same cell then gets the answer computed for the first one to arrive,
+    # which can differ near a label boundary. Only use that where
+    # approximate answers are acceptable. Every lookup names the predictor
+    # version it wants; a different version from the one the entries were
+    # made with empties the cache, so a new model or rule base never sees
+    # stale answers.
+    def __init__(self, max_items=10_000, ttl=3600, decimals=None):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.decimals = decimals
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._items = OrderedDict()  # key -> (stored at, value)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        # PREDICTION_CACHE_SIZE=0 disables caching; PREDICTION_CACHE_DECIMALS
+        # opts in to approximate, rounded keys
+        decimals = os.environ.get("PREDICTION_CACHE_DECIMALS")
+        return cls(max_items=int(os.environ.get("PREDICTION_CACHE_SIZE", 10_000)),
+                   ttl=float(os.environ.get("PREDICTION_CACHE_TTL", 3600)),
+                   decimals=int(decimals) if decimals else None)
+
+    @property
+    def enabled(self):
+        return self.max_items > 0
+
+    def key(self, *features):
+        # NaN becomes None, so it compares equal to itself inside a key
+        if self.decimals is None:
+            return tuple(None if math.isnan(x) else float(x) for x in features)
+        return tuple(None if math.isnan(x) else round(float(x), self.decimals) for x in features)
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._items:
+                self.invalidations += 1
+            self._items.clear()
+            self.version = version
+
+    def get(self, key, version):
+        with self._lock:
+            self._check_version(version)
+            entry = self._items.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._items[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, value):
+        with self._lock:
+            self._check_version(version)
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        return {"size": len(self._items), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "invalidations": self.invalidations}
@@ -0,0 +1,89 @@
+import argparse
+import os
+import sys
+import time
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+from ingest import parse_dates, required_cols
+
+# Replay a recorded OHLCV CSV (the upload format) as a live feed, for demos
+# and load tests: bars are POSTed to the app's /stream/<symbol>/bars, or
+# appended to <tail-dir>/<SYMBOL>.csv for STREAM_TAIL_DIR, at --speed bars
+# per second per symbol (0 = as fast as possible). --copies N feeds the same
+# recording as N symbols, interleaved.
+#
+#   python replay.py recorded.csv --symbol AAPL --speed 5
+#   python replay.py recorded.csv --symbol LOAD --copies 200 --speed 0 --batch 50
+
+
+def read_recording(path):
+    frame = pd.read_csv(path, usecols=required_cols, dtype=str)
+    dates = parse_dates(frame["Date"])
+    frame = frame[~np.isnat(dates)].iloc[np.argsort(dates[~np.isnat(dates)], kind="stable")]
+    return frame[required_cols]
+
+
+def chunks(frame, batch):
+    for start in range(0, len(frame), batch):
+        yield frame.iloc[start:start + batch]
+
+
+def post(url, text):
+    request = urllib.request.Request(url, data=text.encode(), headers={"Content-Type": "text/csv"})
+    with urllib.request.urlopen(request) as response:
+        response.read()
+
+
+def append(path, chunk):
+    new = not os.path.exists(path)
+    with open(path, "a", newline="") as f:
+        chunk.to_csv(f, header=new, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded CSV as a live bar feed")
+    parser.add_argument("recording")
+    parser.add_argument("--symbol", default="REPLAY")
+    parser.add_argument("--copies", type=int, default=1, help="Feed the recording as this many symbols")
+    parser.add_argument("--speed", type=float, default=1.0, help="Bars per second per symbol (0 = unthrottled)")
+    parser.add_argument("--batch", type=int, default=1, help="Bars per POST or append")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="App to POST to")
+    parser.add_argument("--tail-dir", help="Append to <dir>/<SYMBOL>.csv instead of POSTing")
+    args = parser.parse_args()
+
+    frame = read_recording(args.recording)
+    symbols = [args.symbol] if args.copies == 1 else [f"{args.symbol}-{i}" for i in range(1, args.copies + 1)]
+    if args.tail_dir:
+        os.makedirs(args.tail_dir, exist_ok=True)
+    print(f"Replaying {len(frame)} bars as {len(symbols)} symbol(s)")
+
+    latencies = []
+    sent = 0
+    start = time.perf_counter()
+    for i, chunk in enumerate(chunks(frame, args.batch)):
+        for symbol in symbols:
+            begin = time.perf_counter()
+            try:
+                if args.tail_dir:
+                    append(os.path.join(args.tail_dir, f"{symbol.upper()}.csv"), chunk)
+                else:
+                    post(f"{args.url}/stream/{symbol}/bars", chunk.to_csv(index=False))
+            except OSError as e:
+                sys.exit(f"❌ {symbol}: {e}")
+            latencies.append(time.perf_counter() - begin)
+            sent += len(chunk)
+
+        # Pace by bars sent per symbol, so a slow target doesn't make the
+        # replay fall further behind
+        if args.speed > 0:
+            delay = start + (i + 1) * args.batch / args.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    elapsed = time.perf_counter() - start
+    ms = np.array(latencies) * 1000
+    print(f"✅ {sent} bars in {elapsed:.2f}s ({sent / elapsed:,.0f} bars/sec); per request p50 "
+          f"{np.percentile(ms, 50):.2f} ms, p95 {np.percentile(ms, 95):.2f} ms, p99 {np.percentile(ms, 99):.2f} ms")
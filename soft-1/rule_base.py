@@ -0,0 +1,243 @@
+import functools
+import hashlib
+import json
+import operator
+import os
+import sys
+import time
+
+import numpy as np
+
+# The fuzzy rule base is defined once, as data, in rule_base.json. compile()
+# turns it into the sampled membership tables and rule index arrays that the
+# NumPy engine in fuzzy_logic runs on, and load() keeps that result next to
+# the definition (rule_base.npz), tagged with a hash of the definition. Only
+# compiling needs skfuzzy; loading the artifact takes milliseconds, and a
+# changed definition is recompiled automatically.
+# FUZZY_RULES=<path> selects another definition file.
+
+here = os.path.dirname(os.path.abspath(__file__))
+definition_path = os.environ.get("FUZZY_RULES", os.path.join(here, "rule_base.json"))
+artifact_format = 1
+
+# skfuzzy membership functions a definition may use
+shapes = {"trimf", "trapmf", "gaussmf", "gauss2mf", "gbellmf", "sigmf", "dsigmf", "pimf", "smf", "zmf"}
+
+
+def read_definition(path=definition_path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def version(definition):
+    # Content hash: any change to variables, rules or thresholds gives a new version
+    text = json.dumps(definition, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{artifact_format}:{text}".encode()).hexdigest()[:16]
+
+
+def artifact_path(path=definition_path):
+    return os.path.splitext(path)[0] + ".npz"
+
+
+def _universe(spec):
+    return np.arange(*spec)
+
+
+def build(definition):
+    # skfuzzy objects for a definition: (input variables, output variable, rules)
+    import skfuzzy as fuzz
+    from skfuzzy import control as ctrl
+
+    def terms(var, spec):
+        for name, (shape, params) in spec["terms"].items():
+            if shape not in shapes:
+                raise ValueError(f"Unknown membership function {shape!r} for {var.label}.{name}")
+            var[name] = getattr(fuzz, shape)(var.universe, params)
+        return var
+
+    input_vars = [terms(ctrl.Antecedent(_universe(spec["universe"]), name), spec)
+                  for name, spec in definition["inputs"].items()]
+    output = definition["output"]
+    output_var = terms(ctrl.Consequent(_universe(output["universe"]), output["name"]), output)
+
+    by_name = {var.label: var for var in input_vars}
+    rules = []
+    for rule in definition["rules"]:
+        clauses = [by_name[var][term] for var, term in rule["if"].items()]
+        then = output_var[rule["then"]]
+        if "weight" in rule:  # Optional rule weight in [0, 1], default 1
+            then = then % float(rule["weight"])
+        rules.append(ctrl.Rule(functools.reduce(operator.and_, clauses), then))
+    return input_vars, output_var, rules
+
+
+def control_system(definition=None):
+    # The equivalent skfuzzy ControlSystem, for checks against skfuzzy itself
+    from skfuzzy import control as ctrl
+
+    _, _, rules = build(definition or read_definition())
+    return ctrl.ControlSystem(rules)
+
+
+def _and_terms(clause):
+    # Flatten an AND-only antecedent clause into its terms
+    from skfuzzy.control.term import Term
+
+    if isinstance(clause, Term):
+        return [clause]
+    if clause.kind != 'and':
+        raise ValueError(f"Only AND rules can be compiled, got: {clause}")
+    return _and_terms(clause.term1) + _and_terms(clause.term2)
+
+
+def _shape(mf):
+    # Peak index, rising side and reversed falling side (both ascending)
+    peak = int(np.argmax(mf))
+    return peak, mf[:peak + 1], mf[peak:][::-1]
+
+
+# Compile the rule base into NumPy arrays once, so whole batches can be
+# scored without skfuzzy's per-sample graph walk
+def compile_engine(rules, input_vars, output_var):
+    # Sampled membership tables for every input term
+    in_terms = []
+    for v, var in enumerate(input_vars):
+        for term in var.terms.values():
+            in_terms.append((v, var.universe.astype(float), term.mf.astype(float), term))
+    term_index = {id(t[3]): i for i, t in enumerate(in_terms)}
+
+    # Only output terms used by some rule take part in defuzzification
+    out_terms = [t for t in output_var.terms.values()
+                 if any(c.term is t for r in rules for c in r.consequent)]
+    out_index = {id(t): j for j, t in enumerate(out_terms)}
+
+    # One row per (rule, consequent) pair: antecedent term indices padded
+    # with an "always 1" row, the output term it fires and its weight
+    rows = []
+    for r in rules:
+        idx = [term_index[id(t)] for t in _and_terms(r.antecedent)]
+        for c in r.consequent:
+            rows.append((idx, out_index[id(c.term)], c.weight))
+    width = max(len(idx) for idx, _, _ in rows)
+    pad = len(in_terms)
+    rule_terms = np.full((len(rows), width), pad, dtype=np.intp)
+    for i, (idx, _, _) in enumerate(rows):
+        rule_terms[i, :len(idx)] = idx
+
+    # Area and moment of the output over its universe points are linear in the
+    # membership values, so they reduce to two dot products per sample
+    universe = output_var.universe.astype(float)
+    x1, dx = universe[:-1], np.diff(universe)
+    area_weights = np.zeros_like(universe)
+    moment_weights = np.zeros_like(universe)
+    area_weights[:-1] += 0.5 * dx
+    area_weights[1:] += 0.5 * dx
+    moment_weights[:-1] += dx * (0.5 * x1 + dx / 6)
+    moment_weights[1:] += dx * (0.5 * x1 + dx / 3)
+
+    return {
+        'in_vars': np.array([t[0] for t in in_terms], dtype=np.intp),
+        'in_universes': [t[1] for t in in_terms],
+        'in_mfs': [t[2] for t in in_terms],
+        'rule_terms': rule_terms,
+        'rule_out': np.array([r[1] for r in rows], dtype=np.intp),
+        'rule_weight': np.array([r[2] for r in rows], dtype=float),
+        'out_universe': universe,
+        'out_mfs': np.array([t.mf for t in out_terms], dtype=float),
+        'out_shapes': [_shape(t.mf.astype(float)) for t in out_terms],
+        'area_weights': area_weights,
+        'moment_weights': moment_weights,
+        'bounds': [(float(var.universe.min()), float(var.universe.max())) for var in input_vars],
+    }
+
+
+def compile(definition):
+    input_vars, output_var, rules = build(definition)
+    engine = compile_engine(rules, input_vars, output_var)
+    engine['version'] = version(definition)
+    engine['input_names'] = [var.label for var in input_vars]
+    engine['thresholds'] = (float(definition["thresholds"]["buy"]), float(definition["thresholds"]["sell"]))
+    return engine
+
+
+def save_artifact(engine, path):
+    # Ragged per-term tables are stored concatenated, with offsets
+    sizes = [len(u) for u in engine['in_universes']]
+    arrays = {
+        'format': np.array(artifact_format),
+        'version': np.array(engine['version']),
+        'input_names': np.array(engine['input_names']),
+        'thresholds': np.array(engine['thresholds']),
+        'in_vars': engine['in_vars'],
+        'in_offsets': np.cumsum([0] + sizes),
+        'in_universes': np.concatenate(engine['in_universes']),
+        'in_mfs': np.concatenate(engine['in_mfs']),
+        'out_peaks': np.array([shape[0] for shape in engine['out_shapes']], dtype=np.intp),
+        'bounds': np.array(engine['bounds'], dtype=float),
+    }
+    for key in ('rule_terms', 'rule_out', 'rule_weight', 'out_universe', 'out_mfs', 'area_weights', 'moment_weights'):
+        arrays[key] = engine[key]
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+
+def load_artifact(path):
+    with np.load(path) as data:
+        if int(data['format']) != artifact_format:
+            raise ValueError(f"{path} is format {int(data['format'])}, expected {artifact_format}")
+        offsets = data['in_offsets']
+        universes, mfs = data['in_universes'], data['in_mfs']
+        out_mfs = data['out_mfs']
+        return {
+            'version': str(data['version']),
+            'input_names': [str(name) for name in data['input_names']],
+            'thresholds': tuple(float(t) for t in data['thresholds']),
+            'in_vars': data['in_vars'],
+            'in_universes': [universes[a:b] for a, b in zip(offsets[:-1], offsets[1:])],
+            'in_mfs': [mfs[a:b] for a, b in zip(offsets[:-1], offsets[1:])],
+            'rule_terms': data['rule_terms'],
+            'rule_out': data['rule_out'],
+            'rule_weight': data['rule_weight'],
+            'out_universe': data['out_universe'],
+            'out_mfs': out_mfs,
+            'out_shapes': [(int(peak), mf[:peak + 1], mf[peak:][::-1]) for peak, mf in zip(data['out_peaks'], out_mfs)],
+            'area_weights': data['area_weights'],
+            'moment_weights': data['moment_weights'],
+            'bounds': [tuple(float(b) for b in pair) for pair in data['bounds']],
+        }
+
+
+def load(path=definition_path):
+    # Compiled engine for a definition file, from its artifact when that is
+    # current, otherwise compiled now and saved for the next process
+    definition = read_definition(path)
+    compiled = artifact_path(path)
+    try:
+        engine = load_artifact(compiled)
+        if engine['version'] == version(definition):
+            return engine
+    except (OSError, KeyError, ValueError):
+        pass
+
+    engine = compile(definition)
+    try:
+        save_artifact(engine, compiled)
+    except OSError:
+        pass  # Read-only install: still works, just compiles per process
+    return engine
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else definition_path
+    start = time.perf_counter()
+    engine = compile(read_definition(path))
+    save_artifact(engine, artifact_path(path))
+    compiled = time.perf_counter() - start
+
+    start = time.perf_counter()
+    load_artifact(artifact_path(path))
+    print(f"✅ Rule base {engine['version']} ({len(engine['rule_out'])} rules) compiled in {compiled:.2f}s "
+          f"-> {artifact_path(path)} (loads in {(time.perf_counter() - start) * 1000:.1f} ms)")
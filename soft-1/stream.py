@@ -0,0 +1,219 @@
+import csv
+import io
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import indicators
+from ingest import InvalidUpload, parse_dates, parse_volume, required_cols
+
+# Live bar feeds. Bars appended for a symbol (POSTed CSV chunks, or lines
+# appended to a tailed file) advance that symbol's indicators in O(1) with
+# indicators.update(), are scored, and the signal is pushed to every
+# subscriber. All symbols share one hub and, for files, one tail thread;
+# a symbol costs a small state array, not a worker. The hub lives in one
+# process: bars POSTed to one worker never reach subscribers on another, so
+# serve streams from a single worker (or put a shared pub/sub in front).
+
+symbol_pattern = re.compile(r"^[A-Za-z0-9.^_-]{1,20}$")
+
+
+def parse_bars(text):
+    # CSV text with the upload columns (header required) to bar dicts in
+    # date order; rows with a bad date, price or volume raise InvalidUpload
+    rows = list(csv.DictReader(io.StringIO(text)))
+    if not rows:
+        return []
+    if not set(required_cols).issubset(rows[0]):
+        raise InvalidUpload(f"Bars need the columns {', '.join(required_cols)}")
+    for number, row in enumerate(rows, start=2):
+        if None in row.values():
+            raise InvalidUpload(f"Line {number} has fewer fields than the header")
+
+    dates = parse_dates([row["Date"] for row in rows])
+    bars = []
+    for row, date in zip(rows, dates):
+        if np.isnat(date):
+            raise InvalidUpload(f"Invalid date: {row['Date']}")
+        try:
+            bar = {name.lower(): float(row[name].replace(',', '')) for name in ("Open", "High", "Low", "Close")}
+        except ValueError:
+            raise InvalidUpload(f"Invalid price on {row['Date']}") from None
+        bar["volume"] = parse_volume(row["Volume"])
+        bar["date"] = date
+        bars.append(bar)
+    bars.sort(key=lambda bar: bar["date"])
+    return bars
+
+
+class SymbolFeed:
+    def __init__(self, backlog):
+        self.state = indicators.new_state()
+        self.last_date = None
+        self.seq = 0
+        self.backlog = deque(maxlen=backlog)  # Recent signals for (re)connecting subscribers
+        self.subscribers = set()
+        self.active = time.monotonic()  # Last bar, subscribe or unsubscribe
+        self.lock = threading.Lock()
+
+
+class StreamHub:
+    # score(close, volume, high, low, rsi, ma_trend, price_change,
+    # volume_change) returns the signal's prediction fields. Subscribers are
+    # bounded queues; one that falls max_queue signals behind is dropped
+    # rather than slowing the feed.
+    #
+    # Feeds are created by bars only. A feed with no subscribers is dropped
+    # once idle for idle_ttl seconds, or sooner, least recently active
+    # first, when a new symbol would exceed max_symbols.
+    def __init__(self, score, backlog=100, max_symbols=1000, max_queue=1000, idle_ttl=3600):
+        self.score = score
+        self.backlog = backlog
+        self.max_symbols = max_symbols
+        self.max_queue = max_queue
+        self.idle_ttl = idle_ttl
+        self.bars = 0
+        self.dropped = 0
+        self.evicted = 0
+        self._feeds = {}
+        self._lock = threading.Lock()
+
+    def feed(self, symbol):
+        with self._lock:
+            feed = self._feeds.get(symbol)
+            if feed is None:
+                self._evict(full=len(self._feeds) >= self.max_symbols)
+                if len(self._feeds) >= self.max_symbols:
+                    raise InvalidUpload(f"Already streaming {self.max_symbols} symbols")
+                feed = self._feeds[symbol] = SymbolFeed(self.backlog)
+            feed.active = time.monotonic()
+            return feed
+
+    def _evict(self, full):
+        # Called with self._lock held
+        now = time.monotonic()
+        idle = [(feed.active, symbol) for symbol, feed in self._feeds.items() if not feed.subscribers]
+        expired = [symbol for active, symbol in idle if now - active > self.idle_ttl]
+        if full and idle and not expired:
+            expired = [min(idle)[1]]
+        for symbol in expired:
+            del self._feeds[symbol]
+            self.evicted += 1
+
+    @property
+    def symbols(self):
+        return len(self._feeds)
+
+    def push(self, symbol, bars):
+        # Bars not newer than the last one seen are skipped, so a feed can
+        # be replayed or re-sent safely. Returns the new signals.
+        feed = self.feed(symbol)
+        signals = []
+        with feed.lock:
+            for bar in bars:
+                if feed.last_date is not None and bar["date"] <= feed.last_date:
+                    continue
+                price_change, volume_change, ma_trend, rsi = indicators.update(feed.state, bar["close"], bar["volume"])
+                feed.last_date = bar["date"]
+                feed.seq += 1
+                signal = {"symbol": symbol, "seq": feed.seq, "date": str(bar["date"].astype("datetime64[D]")),
+                          "close": bar["close"], "rsi": None if np.isnan(rsi) else rsi,
+                          "ma_trend": None if np.isnan(ma_trend) else ma_trend}
+                try:
+                    signal.update(self.score(bar["close"], bar["volume"], bar["high"], bar["low"], rsi, ma_trend,
+                                             price_change, volume_change))
+                except ValueError as e:  # e.g. no fuzzy rule fired
+                    signal["error"] = str(e)
+                feed.backlog.append(signal)
+                signals.append(signal)
+
+                for subscriber in list(feed.subscribers):
+                    try:
+                        subscriber.put_nowait(signal)
+                    except queue.Full:
+                        feed.subscribers.discard(subscriber)
+                        with subscriber.mutex:
+                            subscriber.queue.clear()
+                        subscriber.put_nowait(None)  # Tells the subscriber it was dropped
+                        self.dropped += 1
+            self.bars += len(signals)
+        return signals
+
+    def subscribe(self, symbol, after=0):
+        # A queue of signals, starting with the backlog newer than seq
+        # `after`; None if no bars have arrived for the symbol yet. Added
+        # under the hub lock, so the feed can't be evicted meanwhile.
+        subscriber = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            feed = self._feeds.get(symbol)
+            if feed is None:
+                return None
+            with feed.lock:
+                for signal in list(feed.backlog)[-self.max_queue + 1:]:
+                    if signal["seq"] > after:
+                        subscriber.put_nowait(signal)
+                feed.subscribers.add(subscriber)
+                feed.active = time.monotonic()
+        return subscriber
+
+    def unsubscribe(self, symbol, subscriber):
+        with self._lock:
+            feed = self._feeds.get(symbol)
+        if feed is not None:
+            with feed.lock:
+                feed.subscribers.discard(subscriber)
+                feed.active = time.monotonic()
+
+
+class Tailer:
+    # Stand-in live feed: one thread polls every <SYMBOL>.csv in `directory`
+    # and pushes the complete lines appended since the last poll. A file
+    # that shrinks is read again from the start.
+    def __init__(self, hub, directory, interval=1.0):
+        self.hub = hub
+        self.directory = directory
+        self.interval = interval
+        self._files = {}  # path -> (offset, header line)
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or self._thread[0] != os.getpid():
+            thread = threading.Thread(target=self._run, name="stream-tailer", daemon=True)
+            thread.start()
+            self._thread = (os.getpid(), thread)
+
+    def _run(self):
+        while True:
+            self.poll()
+            time.sleep(self.interval)
+
+    def poll(self):
+        for name in sorted(os.listdir(self.directory)):
+            symbol, ext = os.path.splitext(name)
+            if ext.lower() == ".csv" and symbol_pattern.match(symbol):
+                try:
+                    self._read(os.path.join(self.directory, name), symbol.upper())
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Skipping new lines in {name}: {e}")
+
+    def _read(self, path, symbol):
+        offset, header = self._files.get(path, (0, None))
+        if os.path.getsize(path) < offset:
+            offset, header = 0, None
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # Leave a half-written last line for the next poll
+        if end == 0:
+            return
+        lines = data[:end].decode().splitlines()
+        if header is None:
+            header, lines = lines[0], lines[1:]
+        self._files[path] = (offset + end, header)
+        if lines:
+            self.hub.push(symbol, parse_bars("\n".join([header] + lines)))
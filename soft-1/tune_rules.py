@@ -0,0 +1,348 @@
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import columnar
+import features
+import fuzzy_logic
+import indicators
+import market_data
+import rule_base
+
+# Tune the rule base's membership breakpoints, Buy/Sell thresholds and
+# (with --tune-weights) rule weights by random or evolutionary search.
+# Candidates are scored in batches on a process pool. The feature arrays
+# sit in shared memory, so workers never copy them. A candidate only
+# re-samples the membership tables of the compiled engine, with the same
+# skfuzzy functions rule_base.build() uses, so nothing is recompiled per
+# evaluation.
+#
+# Fitness is one of:
+#   sharpe / return  backtest of the fuzzy signals over OHLCV history
+#                    (--input long-format table or --symbols), scored like
+#                    backtest.py
+#   accuracy         balanced accuracy against a Label column (-1/0/1), for
+#                    feature tables such as data_preprocessing.py writes
+#                    (--labels)
+#
+# The last --validation share of every symbol (or of the labelled rows) is
+# held out and only used to report the winner against the starting rule
+# base. State is checkpointed after every generation; rerunning with the
+# same --checkpoint resumes. The winner is written as a rule-base JSON for
+# FUZZY_RULES=<output>.
+#
+#   python tune_rules.py --symbols AAPL MSFT --generations 30 --output rule_base_tuned.json
+
+tunable_shapes = {"trimf", "trapmf"}
+
+
+def parameter_space(definition, tune_weights=False):
+    # (kind, location, low, high) for every tuned number. Breakpoints on a
+    # universe edge (the flat shoulders) stay fixed.
+    space = []
+    for var, spec in definition["inputs"].items():
+        universe = rule_base._universe(spec["universe"])
+        low, high = float(universe.min()), float(universe.max())
+        for term, (shape, params) in spec["terms"].items():
+            if shape in tunable_shapes:
+                for i, value in enumerate(params):
+                    if low < value < high:
+                        space.append(("breakpoint", (var, term, i), low, high))
+    space.append(("threshold", "buy", 0.0, 1.0))
+    space.append(("threshold", "sell", -1.0, 0.0))
+    if tune_weights:
+        space.extend(("weight", i, 0.0, 1.0) for i in range(len(definition["rules"])))
+    return space
+
+
+def initial_vector(definition, space):
+    values = []
+    for kind, where, _, _ in space:
+        if kind == "breakpoint":
+            var, term, i = where
+            values.append(definition["inputs"][var]["terms"][term][1][i])
+        elif kind == "threshold":
+            values.append(definition["thresholds"][where])
+        else:
+            values.append(definition["rules"][where].get("weight", 1.0))
+    return np.array(values, dtype=float)
+
+
+def apply(definition, space, vector):
+    # The definition with a candidate's values; breakpoints of each term are
+    # kept in order so every shape stays valid
+    result = copy.deepcopy(definition)
+    for (kind, where, _, _), value in zip(space, vector):
+        value = round(float(value), 4)
+        if kind == "breakpoint":
+            var, term, i = where
+            result["inputs"][var]["terms"][term][1][i] = value
+        elif kind == "threshold":
+            result["thresholds"][where] = value
+        else:
+            result["rules"][where]["weight"] = value
+    for spec in result["inputs"].values():
+        for shape, params in spec["terms"].values():
+            if shape in tunable_shapes:
+                params.sort()
+    return result
+
+
+def candidate_engine(base, definition):
+    # The compiled engine with this definition's membership tables,
+    # thresholds and rule weights (the rules themselves must be unchanged)
+    import skfuzzy as fuzz
+
+    engine = dict(base)
+    engine['in_mfs'] = [getattr(fuzz, shape)(universe, params).astype(float)
+                        for universe, (shape, params) in zip(
+                            base['in_universes'],
+                            (term for spec in definition["inputs"].values() for term in spec["terms"].values()))]
+    engine['thresholds'] = (float(definition["thresholds"]["buy"]), float(definition["thresholds"]["sell"]))
+    engine['rule_weight'] = np.array([float(rule.get("weight", 1.0)) for rule in definition["rules"]])
+    return engine
+
+
+def fitness(engine, data, objective, cost=0.0005, short=False):
+    labels, _ = fuzzy_logic.predict_batch(*data["inputs"], engine=engine)
+    if objective == "accuracy":
+        predicted = np.select([labels == "Buy", labels == "Hold", labels == "Sell"], [1, 0, -1], 2)
+        recalls = [np.mean(predicted[data["labels"] == k] == k) for k in (-1, 0, 1) if (data["labels"] == k).any()]
+        return float(np.mean(recalls))
+
+    # Per symbol, so positions never carry over from one symbol to the next
+    bounds = list(data["starts"]) + [len(labels)]
+    daily = np.concatenate([
+        backtest.simulate(data["close"][a:b], backtest.positions(labels[a:b], short), cost)[0]
+        for a, b in zip(bounds[:-1], bounds[1:])])
+    if objective == "return":
+        return float(np.log1p(daily).sum())
+    std = daily.std()
+    return float(daily.mean() / std * np.sqrt(backtest.trading_days)) if std > 0 else float("-inf")
+
+
+# Datasets: {"inputs": (4, n) fuzzy inputs, "starts": segment starts, and
+# "close" (backtest) or "labels" (accuracy)}
+
+def history_dataset(histories, validation):
+    train, held_out = [], []
+    for columns in histories.values():
+        close, volume, high, low = (np.asarray(columns[name], dtype=float) for name in ("Close", "Volume", "High", "Low"))
+        history = indicators.compute(close, volume)
+        rows = features.compute(close, volume, high, low, history["RSI"], history["MA Trend"],
+                                history["Price Change %"], history["Volume Change %"])
+        inputs = rows[[features.PRICE_CHANGE, features.VOLUME_CHANGE, features.RSI, features.MA_TREND]]
+        cut = int(len(close) * (1 - validation))
+        train.append((inputs[:, :cut], close[:cut]))
+        held_out.append((inputs[:, cut:], close[cut:]))
+
+    def combine(parts):
+        parts = [(inputs, close) for inputs, close in parts if len(close) >= 2]
+        if not parts:
+            return {"inputs": np.empty((4, 0)), "close": np.empty(0), "starts": np.zeros(0, np.int64)}
+        return {"inputs": np.concatenate([p[0] for p in parts], axis=1),
+                "close": np.concatenate([p[1] for p in parts]),
+                "starts": np.cumsum([0] + [len(p[1]) for p in parts[:-1]]).astype(np.int64)}
+    return combine(train), combine(held_out)
+
+
+def labelled_dataset(path, validation):
+    columns = indicators.feature_columns + ["Label"]
+    frame = columnar.read_table(path, columns=columns).dropna()
+    inputs = frame[['Price Change %', 'Volume Change %', 'RSI', 'MA Trend']].to_numpy(dtype=float).T
+    labels = frame["Label"].to_numpy(dtype=np.int8)
+    cut = int(len(labels) * (1 - validation))
+    return ({"inputs": np.ascontiguousarray(inputs[:, :cut]), "labels": labels[:cut], "starts": np.zeros(1, np.int64)},
+            {"inputs": np.ascontiguousarray(inputs[:, cut:]), "labels": labels[cut:], "starts": np.zeros(1, np.int64)})
+
+
+def share(data):
+    # Copy a dataset into one shared memory block; returns the block and the
+    # layout workers need to map it
+    layout, offset = {}, 0
+    for name, array in data.items():
+        layout[name] = (offset, array.shape, array.dtype.str)
+        offset += -(-array.nbytes // 64) * 64
+    block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, array in data.items():
+        start, shape, dtype = layout[name]
+        np.ndarray(shape, dtype, buffer=block.buf, offset=start)[...] = array
+    return block, layout
+
+
+_worker = {}
+
+
+def _init_worker(block_name, layout, rules_path, objective, cost, short):
+    block = shared_memory.SharedMemory(name=block_name)
+    _worker.update(block=block, base=rule_base.load(rules_path), objective=objective, cost=cost, short=short,
+                   data={name: np.ndarray(shape, dtype, buffer=block.buf, offset=start)
+                         for name, (start, shape, dtype) in layout.items()})
+
+
+def _evaluate(definitions):
+    w = _worker
+    return [fitness(candidate_engine(w["base"], d), w["data"], w["objective"], w["cost"], w["short"]) for d in definitions]
+
+
+class Search:
+    # Random search, or a (mu + lambda) evolution strategy: children are
+    # uniform crossovers of tournament-picked parents plus Gaussian noise
+    # of `sigma` times each parameter's range
+    def __init__(self, space, strategy, population, sigma, rng):
+        self.low = np.array([s[2] for s in space])
+        self.high = np.array([s[3] for s in space])
+        self.strategy = strategy
+        self.population = population
+        self.sigma = sigma
+        self.rng = rng
+
+    def random(self, n):
+        return self.rng.uniform(self.low, self.high, (n, len(self.low)))
+
+    def children(self, vectors, scores, n):
+        if self.strategy == "random" or not len(vectors):
+            return self.random(n)
+        picks = self.rng.integers(0, len(vectors), (n, 2, 2))
+        parents = np.where(scores[picks[..., 0]] >= scores[picks[..., 1]], picks[..., 0], picks[..., 1])
+        mask = self.rng.random((n, len(self.low))) < 0.5
+        kids = np.where(mask, vectors[parents[:, 0]], vectors[parents[:, 1]])
+        kids += self.rng.normal(0, self.sigma, kids.shape) * (self.high - self.low)
+        return np.clip(kids, self.low, self.high)
+
+    def survivors(self, vectors, scores):
+        order = np.argsort(-scores, kind="stable")[:self.population]
+        return vectors[order], scores[order]
+
+
+def save_checkpoint(path, state):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune fuzzy membership breakpoints, thresholds and rule weights")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--input", help="Long-format CSV or .cols bundle with Symbol, Date and OHLCV columns")
+    source.add_argument("--symbols", nargs="+", default=["AAPL"], help="Symbols to load through market_data")
+    source.add_argument("--labels", help="Feature table with a Label column (-1/0/1); implies --objective accuracy")
+    parser.add_argument("--start", default="2018-01-01")
+    parser.add_argument("--end", default=str(pd.Timestamp.now().date()))
+    parser.add_argument("--objective", choices=["sharpe", "return", "accuracy"], default="sharpe")
+    parser.add_argument("--cost", type=float, default=5, help="Cost per unit of turnover, in basis points")
+    parser.add_argument("--short", action="store_true", help="Go short on Sell instead of flat")
+    parser.add_argument("--validation", type=float, default=0.2, help="Share of each history held out")
+    parser.add_argument("--rules", default=rule_base.definition_path, help="Starting rule-base definition")
+    parser.add_argument("--tune-weights", action="store_true", help="Also tune rule weights")
+    parser.add_argument("--strategy", choices=["evolve", "random"], default="evolve")
+    parser.add_argument("--generations", type=int, default=20)
+    parser.add_argument("--population", type=int, default=32, help="Survivors kept per generation")
+    parser.add_argument("--children", type=int, default=64, help="Candidates evaluated per generation")
+    parser.add_argument("--sigma", type=float, default=0.05, help="Mutation size as a share of each range")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--checkpoint", default="tune_checkpoint.json")
+    parser.add_argument("--fresh", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--output", default="rule_base_tuned.json")
+    args = parser.parse_args()
+
+    objective = "accuracy" if args.labels else args.objective
+    if objective == "accuracy" and not args.labels:
+        sys.exit("❌ --objective accuracy needs --labels")
+
+    definition = rule_base.read_definition(args.rules)
+    base = rule_base.load(args.rules)
+    space = parameter_space(definition, args.tune_weights)
+
+    loaded = time.perf_counter()
+    if args.labels:
+        train, held_out = labelled_dataset(args.labels, args.validation)
+    else:
+        if args.input:
+            histories = backtest.split_symbols(columnar.read_table(args.input))
+        else:
+            histories = {symbol: {name: data[name].to_numpy() for name in market_data.ohlcv_columns}
+                         for symbol, data in market_data.load_many(args.symbols, args.start, args.end).items()}
+        if not histories:
+            sys.exit("❌ No price history to tune on")
+        train, held_out = history_dataset(histories, args.validation)
+    print(f"{train['inputs'].shape[1]} training rows, {held_out['inputs'].shape[1]} held out, "
+          f"{len(space)} parameters (loaded in {time.perf_counter() - loaded:.2f}s)")
+
+    # Resume only a run with the same setup
+    config = {"rules": rule_base.version(definition), "objective": objective, "data": args.labels or args.input or args.symbols,
+              "start": args.start, "end": args.end, "validation": args.validation, "cost": args.cost, "short": args.short,
+              "tune_weights": args.tune_weights, "strategy": args.strategy, "seed": args.seed}
+    rng = np.random.default_rng(args.seed)
+    state = None
+    if os.path.exists(args.checkpoint) and not args.fresh:
+        with open(args.checkpoint) as f:
+            state = json.load(f)
+        if state["config"] != config:
+            sys.exit(f"❌ {args.checkpoint} is from a different setup; use --fresh or another --checkpoint")
+        rng.bit_generator.state = state["rng"]
+        print(f"Resuming after generation {state['generation']} ({state['evaluations']} evaluations)")
+
+    search = Search(space, args.strategy, args.population, args.sigma, rng)
+    evaluate_one = lambda engine, data: fitness(engine, data, objective, args.cost / 10_000, args.short)
+    start_vector = initial_vector(definition, space)
+    baseline = evaluate_one(base, train)
+
+    if state is None:
+        state = {"config": config, "generation": 0, "evaluations": 1, "seconds": 0.0,
+                 "vectors": [start_vector.tolist()], "scores": [baseline]}
+    vectors, scores = np.array(state["vectors"]), np.array(state["scores"])
+
+    block, layout = share(train)
+    try:
+        with ProcessPoolExecutor(max(args.workers, 1), initializer=_init_worker,
+                                 initargs=(block.name, layout, args.rules, objective, args.cost / 10_000, args.short)) as pool:
+            for generation in range(state["generation"] + 1, args.generations + 1):
+                started = time.perf_counter()
+                kids = search.children(vectors, scores, args.children)
+                definitions = [apply(definition, space, kid) for kid in kids]
+                size = -(-len(definitions) // (max(args.workers, 1) * 4))
+                batches = [definitions[i:i + size] for i in range(0, len(definitions), size)]
+                kid_scores = np.array([s for batch in pool.map(_evaluate, batches) for s in batch])
+                kid_scores[np.isnan(kid_scores)] = -np.inf
+
+                vectors, scores = search.survivors(np.vstack([vectors, kids]), np.concatenate([scores, kid_scores]))
+                elapsed = time.perf_counter() - started
+                state.update(generation=generation, evaluations=state["evaluations"] + len(kids),
+                             seconds=state["seconds"] + elapsed, vectors=vectors.tolist(),
+                             scores=[float(s) for s in scores], rng=rng.bit_generator.state)
+                save_checkpoint(args.checkpoint, state)
+                print(f"Generation {generation}: best {objective} {scores[0]:.4f} (start {baseline:.4f}), "
+                      f"{len(kids)} evaluations in {elapsed:.2f}s ({len(kids) / elapsed:,.1f} evaluations/sec)")
+    finally:
+        block.close()
+        block.unlink()
+
+    # Write the winner, then check that the file compiles to the same scores
+    winner = apply(definition, space, vectors[0])
+    with open(args.output, "w") as f:
+        json.dump(winner, f, indent=1)
+    tuned = rule_base.load(args.output)
+    reloaded = evaluate_one(tuned, train)
+    if not np.isclose(reloaded, scores[0], rtol=1e-6, equal_nan=True):
+        print(f"⚠️ {args.output} scores {reloaded:.4f} when reloaded, expected {scores[0]:.4f}")
+
+    print(f"\n{objective:>10}  {'start':>10}  {'tuned':>10}")
+    print(f"{'train':>10}  {baseline:10.4f}  {reloaded:10.4f}")
+    if held_out["inputs"].shape[1]:
+        print(f"{'held out':>10}  {evaluate_one(base, held_out):10.4f}  {evaluate_one(tuned, held_out):10.4f}")
+    if state["seconds"]:
+        print(f"\n✅ {state['evaluations']} evaluations in {state['seconds']:.1f}s "
+              f"({(state['evaluations'] - 1) / state['seconds']:,.1f} evaluations/sec) over {train['inputs'].shape[1]} rows")
+    print(f"   Winner written to {args.output}; use it with FUZZY_RULES={args.output}")